@@ -4,13 +4,15 @@ from pydantic import BaseModel
 from typing import List, Optional
 import pandas as pd
 import numpy as np
-from shapely.geometry import Point, Polygon
+from shapely.geometry import Polygon
 import joblib
 import os
 from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 from xgboost import XGBRegressor
 
+from backend.spatial import build_polygon, points_in_polygon
+
 # -----------------------------
 # FastAPI App Configuration
 # -----------------------------
@@ -144,11 +146,11 @@ def load_or_generate_dataset():
 def filter_by_polygon(df: pd.DataFrame, polygon_points: List[List[float]]) -> pd.DataFrame:
     """Filter sites within the specified polygon"""
     try:
-        # Create polygon (shapely uses lon, lat order)
-        polygon = Polygon([(lon, lat) for lat, lon in polygon_points])
+        # Create prepared polygon (shapely uses lon, lat order)
+        polygon = build_polygon(polygon_points)
         
-        # Filter sites within polygon
-        mask = df.apply(lambda row: polygon.contains(Point(row["lon"], row["lat"])), axis=1)
+        # Filter sites within polygon using vectorized containment
+        mask = points_in_polygon(polygon, df["lat"].to_numpy(), df["lon"].to_numpy())
         filtered_df = df[mask].copy()
         
         return filtered_df
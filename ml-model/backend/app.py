@@ -1,24 +1,3 @@
-# After FastAPI app is created
-from fastapi import APIRouter
-
-debug_router = APIRouter()
-
-@debug_router.get("/debug-env")
-async def debug_env():
-    import os
-    return {
-        "env": {
-            "API_KEY": os.environ.get("ML_API_KEY", "NOT SET"),
-            "HOST": os.environ.get("HOST", "NOT SET"),
-            "PORT": os.environ.get("PORT", "NOT SET"),
-            "NODE_ENV": os.environ.get("NODE_ENV", "NOT SET")
-        }
-    }
-
-app.include_router(debug_router)
-
-# After FastAPI app is created
-app.include_router(debug_router)
 """
 Main FastAPI application for Hydrogen Site Recommender
 """
@@ -26,14 +5,18 @@ Main FastAPI application for Hydrogen Site Recommender
 import time
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import settings
 from .middleware import setup_middleware
-from .routes import router
+from .routes import readiness_response, router
 from .ml_service import ml_service
+from .geocoding import geocoding_client
+from .geocode_cache import geocode_cache
+from .pipeline import pipeline
+from .warmup import warmup
 
 # Configure logging
 logging.basicConfig(
@@ -48,26 +31,22 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Hydrogen Site Recommender API...")
     
-    try:
-        # Load dataset
-        ml_service.load_dataset()
-        logger.info(f"✅ Dataset loaded: {ml_service.dataset_loaded}")
-        
-        # Load or train model
-        if not ml_service.load_model():
-            ml_service.train_model_if_needed()
-        logger.info(f"✅ Model ready: {ml_service.model_loaded}")
-        
-        logger.info("🎉 API startup complete!")
-        
-    except Exception as e:
-        logger.error(f"❌ Startup failed: {e}")
-        logger.warning("API will start but may not function properly until model is loaded")
+    if settings.WARMUP_IN_BACKGROUND:
+        # Bind the port now; /ready reports progress and heavy endpoints
+        # answer 503 with Retry-After until the artifacts are loaded
+        warmup.start()
+        logger.info("⏳ Loading model and dataset in the background (progress at /ready)")
+    else:
+        warmup.start(background=False)
+        logger.info(f"🎉 API startup complete! Ready: {warmup.ready}")
     
     yield
     
     # Shutdown
     logger.info("🛑 Shutting down Hydrogen Site Recommender API...")
+    await geocoding_client.aclose()
+    geocode_cache.close()
+    pipeline.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
@@ -85,6 +64,22 @@ setup_middleware(app)
 # Include routes
 app.include_router(router, prefix="/api/v1")
 
+debug_router = APIRouter()
+
+@debug_router.get("/debug-env")
+async def debug_env():
+    import os
+    return {
+        "env": {
+            "API_KEY": os.environ.get("ML_API_KEY", "NOT SET"),
+            "HOST": os.environ.get("HOST", "NOT SET"),
+            "PORT": os.environ.get("PORT", "NOT SET"),
+            "NODE_ENV": os.environ.get("NODE_ENV", "NOT SET")
+        }
+    }
+
+app.include_router(debug_router)
+
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -111,8 +106,10 @@ async def root():
         "status": "healthy",
         "model_loaded": ml_service.model_loaded,
         "dataset_loaded": ml_service.dataset_loaded,
+        "ready": warmup.ready,
         "docs": "/docs",
-        "health": "/api/v1/health"
+        "health": "/api/v1/health",
+        "ready_check": "/ready"
     }
 
 # Health check endpoint
@@ -132,6 +129,12 @@ async def health_check():
         "uptime_seconds": status["uptime_seconds"]
     }
 
+# Readiness endpoint
+@app.get("/ready")
+async def readiness_check():
+    """Readiness check with warm-up progress (503 until ready)"""
+    return readiness_response()
+
 # Info endpoint
 @app.get("/info")
 async def get_info():
@@ -153,6 +156,7 @@ async def get_info():
         "endpoints": [
             "GET / - Health check",
             "GET /health - Health check",
+            "GET /ready - Readiness and warm-up progress",
             "GET /info - API information",
             "GET /docs - API documentation",
             "POST /api/v1/recommend_sites - Main recommendation endpoint",
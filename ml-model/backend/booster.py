@@ -0,0 +1,112 @@
+"""
+Native XGBoost booster exported from the pickled sklearn Pipeline
+
+export_model.py saves the Pipeline's booster as UBJSON next to the .pkl, e.g.
+hydrogen_site_model.ubj, with the StandardScaler folded into booster
+attributes (feature order, means and scales). The service loads it without
+unpickling the Pipeline and predicts with one vectorized transform plus
+Booster.inplace_predict on a float32 matrix, skipping the Pipeline and
+DataFrame overhead.
+
+The scaler is applied in float64 exactly as StandardScaler does before the
+float32 cast XGBoost makes anyway, so scores are identical to the Pipeline's.
+Folding it into the split thresholds instead would move sites that sit on a
+threshold (training points do) to the other branch.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from .columnar import file_sha256
+
+logger = logging.getLogger(__name__)
+
+BOOSTER_EXTENSIONS = (".ubj", ".json")
+
+
+def booster_path(model_path: str) -> str:
+    """Native booster file exported from a pickled model"""
+    if model_path.endswith(BOOSTER_EXTENSIONS):
+        return model_path
+    return os.path.splitext(model_path)[0] + ".ubj"
+
+
+class BoosterModel:
+    """Scaler + booster with the predict() interface of the Pipeline it came from"""
+
+    def __init__(self, booster: xgb.Booster):
+        self.booster = booster
+        self.features: List[str] = json.loads(booster.attr("features"))
+        self.mean = np.asarray(json.loads(booster.attr("feature_mean")), dtype=np.float64)
+        self.scale = np.asarray(json.loads(booster.attr("feature_scale")), dtype=np.float64)
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "BoosterModel":
+        """Fold a fitted Pipeline(StandardScaler, XGBRegressor) into a booster"""
+        scaler, regressor = pipeline.steps[0][1], pipeline.steps[-1][1]
+        features = [str(name) for name in scaler.feature_names_in_]
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(len(features))
+        scale = scaler.scale_ if scaler.with_std else np.ones(len(features))
+
+        booster = regressor.get_booster().copy()
+        booster.set_attr(
+            features=json.dumps(features),
+            feature_mean=json.dumps([float(value) for value in mean]),
+            feature_scale=json.dumps([float(value) for value in scale])
+        )
+        return cls(booster)
+
+    def save(self, path: str, source: Optional[Dict] = None) -> None:
+        """Save as UBJSON (or JSON by extension), atomically"""
+        if source is not None:
+            self.booster.set_attr(source=json.dumps(source))
+        tmp_path = f"{os.path.splitext(path)[0]}.tmp{os.getpid()}{os.path.splitext(path)[1]}"
+        self.booster.save_model(tmp_path)
+        os.replace(tmp_path, path)
+
+    def transform(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """Scaled float32 feature matrix; columns in self.features order"""
+        if isinstance(X, pd.DataFrame):
+            X = X[self.features].to_numpy(dtype=np.float64)
+        X = (np.asarray(X, dtype=np.float64) - self.mean) / self.scale
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict(self, X: Union[np.ndarray, pd.DataFrame]) -> np.ndarray:
+        """Predicted scores for a feature matrix or dataframe"""
+        return self.booster.inplace_predict(self.transform(X))
+
+
+def export_booster(model_path: str, output: Optional[str] = None) -> BoosterModel:
+    """Write the booster for a pickled Pipeline next to it (or to output)"""
+    model = BoosterModel.from_pipeline(joblib.load(model_path))
+    model.save(output or booster_path(model_path), source={"sha256": file_sha256(model_path)})
+    return model
+
+
+def load_booster(model_path: str) -> Optional[BoosterModel]:
+    """
+    Booster exported from model_path, or None if there is none or it is older
+    than the pickled model (and the pickle should be loaded instead)
+    """
+    path = booster_path(model_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        model = BoosterModel(xgb.Booster(model_file=path))
+        source = json.loads(model.booster.attr("source") or "{}")
+        if path != model_path and os.path.exists(model_path) and source.get("sha256") != file_sha256(model_path):
+            logger.warning(f"⚠️ {path} was exported from another model; run export_model.py to refresh it")
+            return None
+        return model
+
+    except Exception as e:
+        logger.error(f"❌ Error loading booster {path}: {e}")
+        return None
@@ -0,0 +1,179 @@
+"""
+In-process result caching for polygon recommendations
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from .config import settings
+
+Polygon = Tuple[Tuple[float, float], ...]
+
+
+def canonical_polygon(polygon_points: List[List[float]], decimals: int) -> Polygon:
+    """
+    Canonical form of a polygon ring for cache keys
+    Coordinates are quantized, the closing vertex and repeated vertices are dropped,
+    and the ring is rotated to start at its smallest vertex in its smaller direction,
+    so the same shape drawn from a different start point or direction shares a key
+    """
+    ring = [(round(lat, decimals), round(lon, decimals)) for lat, lon in polygon_points]
+
+    # Drop consecutive duplicates, including a closing vertex equal to the first
+    deduped = [point for i, point in enumerate(ring) if point != ring[i - 1]] or ring[:1]
+
+    start = deduped.index(min(deduped))
+    forward = deduped[start:] + deduped[:start]
+    backward = forward[:1] + forward[:0:-1]
+    return tuple(min(forward, backward))
+
+
+def _entry_size(key: Hashable, value: Any) -> int:
+    """Rough memory footprint of a cache entry in bytes"""
+    size = sys.getsizeof(key)
+    if isinstance(key, tuple) and key and isinstance(key[0], tuple):
+        size += sum(sys.getsizeof(point) for point in key[0])
+    items = value if isinstance(value, tuple) else (value,)
+    for item in items:
+        size += item.nbytes if isinstance(item, np.ndarray) else sys.getsizeof(item)
+    return size
+
+
+class ResultCache:
+    """
+    LRU cache with a TTL and a memory bound
+    Concurrent requests for the same key share one computation
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, int, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.uncached = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return a fresh cached value, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.current_bytes -= size
+                self.expirations += 1
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least recently used entries past the bounds"""
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[1]
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, size, value)
+            self.current_bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                             cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the cached value for key, computing it once across concurrent callers
+        A computed value is only stored if cacheable(value) is true (default: always)
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            # An identical request is already computing this value
+            self.coalesced += 1
+        else:
+            # The computation runs as its own task, so a caller that is cancelled
+            # (client disconnect, shutdown) doesn't cancel it for the others
+            self.misses += 1
+            task = asyncio.ensure_future(self._compute(key, compute, cacheable))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                       cacheable: Optional[Callable[[Any], bool]]) -> Any:
+        value = await compute()
+        if cacheable is None or cacheable(value):
+            self.put(key, value)
+        else:
+            self.uncached += 1
+        return value
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        self._inflight.pop(key, None)
+        # Mark the exception as retrieved when every caller has gone
+        if not task.cancelled():
+            task.exception()
+
+    def clear(self) -> None:
+        """Drop every cached entry (e.g. after a model or dataset reload)"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "uncached": self.uncached,
+            "in_flight": len(self._inflight),
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0
+        }
+
+
+# Global polygon result cache
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=settings.RESULT_CACHE_TTL_SECONDS
+)
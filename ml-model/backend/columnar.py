@@ -0,0 +1,86 @@
+"""
+Columnar binary copy of the site dataset for fast cold starts
+
+The CSV stays the source of truth. convert_dataset.py writes its columns next
+to it as a directory of .npy files with a schema manifest (the shared segment
+format), e.g. hydrogen_sites_generated.columns/. The service memory-maps that
+directory instead of parsing the CSV; columns are only read from disk when a
+request touches them. The manifest records the CSV it was converted from, and
+a CSV edited after conversion is read directly until the copy is refreshed.
+"""
+
+import hashlib
+import logging
+import os
+from typing import Dict, Optional
+
+
+from .shared_segment import attach_segment, read_manifest, write_segment
+from .site_store import SiteStore, read_sites_csv
+
+logger = logging.getLogger(__name__)
+
+
+def columnar_path(csv_path: str) -> str:
+    """Directory holding the columnar copy of a CSV dataset"""
+    return os.path.splitext(csv_path)[0] + ".columns"
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_info(csv_path: str) -> Dict:
+    stat = os.stat(csv_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_sha256(csv_path)}
+
+
+def convert_dataset(csv_path: str, directory: Optional[str] = None) -> SiteStore:
+    """Write the columnar copy of a CSV dataset; returns the converted store"""
+    directory = directory or columnar_path(csv_path)
+    store = SiteStore.from_frame(read_sites_csv(csv_path))
+    write_segment(directory, store, None, extra={"source": _source_info(csv_path)})
+    return store
+
+
+def is_current(csv_path: str, directory: Optional[str] = None) -> bool:
+    """Whether the columnar copy exists and matches the CSV"""
+    directory = directory or columnar_path(csv_path)
+    try:
+        source = read_manifest(directory).get("source") or {}
+    except (OSError, ValueError):
+        return False
+    if not os.path.exists(csv_path):
+        # Deployments may ship only the columnar copy
+        return True
+
+    stat = os.stat(csv_path)
+    if stat.st_size != source.get("size"):
+        return False
+    if stat.st_mtime == source.get("mtime"):
+        return True
+    # Checkouts and image builds reset modification times; compare contents
+    return file_sha256(csv_path) == source.get("sha256")
+
+
+def load_columnar(csv_path: str) -> Optional[SiteStore]:
+    """Memory-mapped store for a CSV dataset, or None if there is no current columnar copy"""
+    directory = columnar_path(csv_path)
+    if not os.path.isdir(directory):
+        return None
+    if not is_current(csv_path, directory):
+        logger.warning(f"⚠️ {directory} is older than {csv_path}; run convert_dataset.py to refresh it")
+        return None
+
+    try:
+        store, _ = attach_segment(directory)
+        logger.info(f"✅ Dataset mapped from columnar copy: {directory}")
+        return store
+    except Exception as e:
+        logger.error(f"❌ Error mapping columnar dataset {directory}: {e}")
+        return None
@@ -3,6 +3,7 @@ Configuration settings for the Hydrogen Site Recommender Backend
 """
 
 import os
+import tempfile
 from typing import List
 
 class Settings:
@@ -31,6 +32,13 @@ class Settings:
     # ML Model Configuration
     MODEL_FILE: str = "hydrogen_site_model.pkl"
     DATASET_FILE: str = "hydrogen_sites_generated.csv"
+    
+    # Scored site arrays are memory-mapped from here and shared by all worker processes
+    SHARED_DATASET_ENABLED: bool = True
+    SHARED_DATASET_DIR: str = (
+        "/dev/shm/hydrogen-site-recommender" if os.path.isdir("/dev/shm")
+        else os.path.join(tempfile.gettempdir(), "hydrogen-site-recommender")
+    )
     FEATURES: List[str] = [
         "capacity",
         "distance_to_renewable", 
@@ -47,6 +55,9 @@ class Settings:
         "lon_max": 97.0
     }
     
+    # Ranked polygon queries use a grid of cells this many degrees on a side
+    SCORE_GRID_CELL_DEG: float = 0.5
+    
     # ML Model Parameters
     MODEL_PARAMS = {
         "n_estimators": 200,
@@ -61,10 +72,56 @@ class Settings:
     MAX_RECOMMENDATIONS: int = 10
     MIN_POLYGON_POINTS: int = 3
     
+    # Model hot-swap (POST /model/reload) sanity checks before a new model goes live
+    MODEL_SANITY_BATCH: int = 256  # sites re-scored to warm the model and check the snapshot
+    MODEL_SANITY_MIN_RANK_CORRELATION: float = 0.5  # Spearman vs the live model's site scores
+    MODEL_HISTORY_SIZE: int = 10
+    
+    # Startup warm-up (load, index and warm artifacts after the port is bound)
+    WARMUP_IN_BACKGROUND: bool = True
+    WARMUP_RETRY_AFTER_SECONDS: int = 5  # Retry-After on 503s while warming up
+    
+    # Request Pipeline Executor (CPU-bound stages run off the event loop)
+    PIPELINE_WORKERS: int = min(4, os.cpu_count() or 1)
+    PIPELINE_MAX_QUEUE: int = 64  # waiting jobs beyond this get 503 + Retry-After
+    
+    # Polygon Result Cache Configuration
+    RESULT_CACHE_MAX_ENTRIES: int = 1024
+    RESULT_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    RESULT_CACHE_TTL_SECONDS: float = 600.0
+    RESULT_CACHE_COORD_DECIMALS: int = 5  # ~1 m; near-identical polygons share an entry
+    
+    # Point Query Configuration (radius / nearest endpoints)
+    MAX_QUERY_RADIUS_KM: float = 500.0
+    MAX_RADIUS_RESULTS: int = 500
+    MAX_NEAREST_SITES: int = 100
+    
     # Reverse Geocoding Configuration
     ENABLE_REVERSE_GEOCODING: bool = True
+    GEOCODER_BACKEND: str = "nominatim"  # "nominatim" (online) or "gazetteer" (local file)
+    GAZETTEER_FILE: str = "gazetteer.csv"  # format documented in backend/gazetteer.py
+    GAZETTEER_MAX_DISTANCE_KM: float = 50.0
+    
+    # Deferred Location Enrichment (recommend_sites?enrichment=deferred)
+    ENRICHMENT_TTL_SECONDS: float = 300.0
+    ENRICHMENT_MAX_JOBS: int = 1000
+    ENRICHMENT_BUDGET_SECONDS: float = 60.0  # background jobs stop and report partial labels after this
     GEOCODING_TIMEOUT: int = 10  # seconds
-    GEOCODING_RATE_LIMIT: float = 1.2  # seconds between requests
+    GEOCODING_RATE_LIMIT: float = 1.2  # seconds between requests, across all worker processes
+    GEOCODING_RATE_LIMIT_FILE: str = os.path.join(tempfile.gettempdir(), "hydrogen_geocoding_rate_limit")
+    GEOCODING_MAX_QUEUE_SECONDS: float = 60.0  # lookups that would wait longer for their slot get fallback labels
+    GEOCODING_REQUEST_BUDGET_SECONDS: float = 5.0  # per response; unresolved sites get fallback labels
+    GEOCODING_BREAKER_FAILURES: int = 5  # consecutive failures before the circuit opens
+    GEOCODING_BREAKER_RESET_SECONDS: float = 60.0  # how long the circuit stays open before a probe
+    
+    # Reverse Geocode Cache Configuration (SQLite file with an in-memory LRU in front)
+    GEOCODE_CACHE_FILE: str = "geocode_cache.sqlite3"
+    GEOCODE_CACHE_DECIMALS: int = 4  # ~11 m; nearby coordinates share a label
+    GEOCODE_CACHE_TTL_SECONDS: float = 30 * 24 * 3600.0
+    GEOCODE_NEGATIVE_TTL_SECONDS: float = 24 * 3600.0  # points Nominatim has no address for
+    GEOCODE_CACHE_MAX_ROWS: int = 200_000
+    GEOCODE_MEMORY_CACHE_SIZE: int = 4096
+    GEOCODE_CACHE_BUSY_TIMEOUT_SECONDS: float = 0.25  # writes skip the file when another process holds it longer
     
     # Logging Configuration
     LOG_LEVEL: str = "INFO"
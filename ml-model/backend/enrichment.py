@@ -0,0 +1,172 @@
+"""
+Deferred location enrichment for recommendation responses
+"""
+
+import asyncio
+import base64
+import binascii
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import orjson
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# (rank index in the response, site_id, (lat, lon))
+PendingSite = Tuple[int, Optional[str], Tuple[float, float]]
+GeocodeMany = Callable[[List[Tuple[float, float]]], Awaitable[List[Dict[str, str]]]]
+
+
+def encode_token(dataset_tag: str, fields: List[str], sites: List[Tuple[int, int]]) -> str:
+    """
+    Enrichment token naming the sites it covers as (rank index, dataset position)
+    Jobs live in the worker that started them; with several workers a follow-up
+    request may reach another one, which rebuilds the job from the token
+    """
+    payload = orjson.dumps([dataset_tag, fields, sites])
+    return secrets.token_urlsafe(6) + "." + base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_token(token: str) -> Optional[Tuple[str, List[str], List[Tuple[int, int]]]]:
+    """(dataset tag, fields, sites) of a token, or None if it is malformed"""
+    try:
+        payload = token.split(".", 1)[1]
+        dataset_tag, fields, sites = orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return str(dataset_tag), [str(field) for field in fields], [(int(i), int(position)) for i, position in sites]
+    except (IndexError, ValueError, TypeError, binascii.Error, orjson.JSONDecodeError):
+        return None
+
+
+class EnrichmentJob:
+    """Location names for one response, published as each lookup resolves"""
+
+    def __init__(self, token: str, total: int, fields: List[str]):
+        self.token = token
+        self.total = total
+        self.fields = fields
+        self.locations: List[Dict[str, Any]] = []
+        self.done = False
+        self.created_at = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    @property
+    def status(self) -> str:
+        return "complete" if self.done else "pending"
+
+    async def publish(self, location: Dict[str, Any]) -> None:
+        async with self._changed:
+            self.locations.append(location)
+            self._changed.notify_all()
+
+    async def finish(self) -> None:
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every location, including those resolved before the caller subscribed"""
+        sent = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: len(self.locations) > sent or self.done)
+                batch = self.locations[sent:]
+                finished = self.done
+            for location in batch:
+                yield location
+            sent += len(batch)
+            if finished and sent == len(self.locations):
+                return
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "token": self.token,
+            "status": self.status,
+            "total_sites": self.total,
+            "resolved_sites": len(self.locations),
+            "locations": list(self.locations)
+        }
+
+
+class EnrichmentStore:
+    """
+    In-flight and recently finished enrichment jobs, looked up by token
+    Jobs expire after a TTL; the oldest are dropped past max_jobs
+    A job stops after budget_seconds and reports the locations resolved so far
+    """
+
+    def __init__(self, max_jobs: int, ttl_seconds: float, budget_seconds: float):
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.budget_seconds = budget_seconds
+        self._jobs: "OrderedDict[str, EnrichmentJob]" = OrderedDict()
+
+    def _discard(self, token: str) -> None:
+        job = self._jobs.pop(token)
+        if job.task is not None and not job.task.done():
+            job.task.cancel()
+
+    def _purge(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._jobs and next(iter(self._jobs.values())).created_at < cutoff:
+            self._discard(next(iter(self._jobs)))
+        while len(self._jobs) >= self.max_jobs:
+            self._discard(next(iter(self._jobs)))
+
+    def start(self, token: str, sites: List[PendingSite], fields: List[str],
+              geocode_many: GeocodeMany) -> EnrichmentJob:
+        """Start resolving locations for the given sites in the background"""
+        self._purge()
+        job = EnrichmentJob(token, len(sites), fields)
+        self._jobs[job.token] = job
+        job.task = asyncio.create_task(self._run(job, sites, geocode_many))
+        return job
+
+    def get(self, token: str) -> Optional[EnrichmentJob]:
+        self._purge()
+        return self._jobs.get(token)
+
+    async def _run(self, job: EnrichmentJob, sites: List[PendingSite], geocode_many: GeocodeMany) -> None:
+        async def resolve(index: int, site_id: Optional[str], coordinate: Tuple[float, float]):
+            location_info = (await geocode_many([coordinate]))[0]
+            return index, site_id, location_info
+
+        tasks = [asyncio.ensure_future(resolve(*site)) for site in sites]
+        try:
+            for resolved in asyncio.as_completed(tasks, timeout=self.budget_seconds):
+                index, site_id, location_info = await resolved
+                location = {"index": index, "site_id": site_id}
+                location.update({field: location_info[field] for field in job.fields})
+                await job.publish(location)
+            logger.info(f"Enrichment {job.token[:8]} resolved {job.total} sites")
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Enrichment {job.token[:8]} budget of {self.budget_seconds}s spent; "
+                f"{len(job.locations)} of {job.total} sites resolved"
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Enrichment {job.token[:8]} failed: {e}")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await job.finish()
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> bytes:
+    """Encode one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+# Global enrichment job store
+enrichment_store = EnrichmentStore(
+    max_jobs=settings.ENRICHMENT_MAX_JOBS,
+    ttl_seconds=settings.ENRICHMENT_TTL_SECONDS,
+    budget_seconds=settings.ENRICHMENT_BUDGET_SECONDS
+)
@@ -0,0 +1,115 @@
+"""
+Offline reverse geocoding against a local gazetteer of place points
+
+The gazetteer is a CSV file with one row per place:
+    lat, lon, city            required
+    district, state, country  optional
+    postcode, display_name    optional (display_name defaults to
+                              "city, district, state, country")
+A site gets the labels of its nearest place, or placeholder labels when no
+place lies within GAZETTEER_MAX_DISTANCE_KM (e.g. offshore points).
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import KDTree
+
+from .config import settings
+from .geocoding import fallback_location
+from .pipeline import pipeline
+from .spatial import EARTH_RADIUS_KM
+
+logger = logging.getLogger(__name__)
+
+GAZETTEER_FIELDS = ["display_name", "city", "state", "country", "postcode", "district"]
+
+
+def unit_vectors(lats: Sequence[float], lons: Sequence[float]) -> np.ndarray:
+    """Points on the unit sphere, so Euclidean KD-tree neighbours are great-circle neighbours"""
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+class Gazetteer:
+    """Nearest-place lookups over a KD-tree of gazetteer points"""
+
+    def __init__(self, path: str, max_distance_km: float):
+        self.path = path
+        self.max_distance_km = max_distance_km
+        self.tree = None
+        self.places: Dict[str, np.ndarray] = {}
+        self.loaded = False
+        self.load_attempted = False
+
+    def load(self) -> bool:
+        """Load the gazetteer file and build the KD-tree"""
+        self.load_attempted = True
+        try:
+            df = pd.read_csv(self.path, dtype={"postcode": str})
+            missing = {"lat", "lon", "city"} - set(df.columns)
+            if missing:
+                raise ValueError(f"missing columns: {sorted(missing)}")
+
+            df = df.dropna(subset=["lat", "lon"]).reset_index(drop=True)
+            if df.empty:
+                raise ValueError("no places with coordinates")
+
+            for field in GAZETTEER_FIELDS:
+                if field not in df.columns:
+                    df[field] = ""
+                df[field] = df[field].fillna("").astype(str)
+
+            composed = df[["city", "district", "state", "country"]].apply(
+                lambda row: ", ".join(part for part in row if part), axis=1
+            )
+            df["display_name"] = df["display_name"].where(df["display_name"] != "", composed)
+
+            self.tree = KDTree(unit_vectors(df["lat"], df["lon"]))
+            self.places = {field: df[field].to_numpy(dtype=object) for field in GAZETTEER_FIELDS}
+            self.loaded = True
+            logger.info(f"✅ Gazetteer loaded: {len(df)} places from {self.path}")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Error loading gazetteer {self.path}: {e}")
+            self.loaded = False
+            return False
+
+    def lookup(self, lats: Sequence[float], lons: Sequence[float]) -> List[Dict[str, str]]:
+        """Location information for many points with one vectorized KD-tree query"""
+        if len(lats) == 0:
+            return []
+        if not self.loaded:
+            return [fallback_location(lat, lon) for lat, lon in zip(lats, lons)]
+
+        chord, nearest = self.tree.query(unit_vectors(lats, lons), k=1)
+        distance_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord[:, 0] / 2, 0.0, 1.0))
+        nearest = nearest[:, 0]
+
+        columns = {field: values[nearest].tolist() for field, values in self.places.items()}
+        locations = [dict(zip(GAZETTEER_FIELDS, row)) for row in zip(*columns.values())]
+
+        for i in np.flatnonzero(distance_km > self.max_distance_km):
+            locations[i] = fallback_location(lats[i], lons[i])
+        return locations
+
+    def reverse_geocode(self, lat: float, lon: float) -> Dict[str, str]:
+        """Convert coordinates to location information"""
+        return self.lookup([lat], [lon])[0]
+
+    async def reverse_geocode_many(self, coordinates: List[Tuple[float, float]],
+                                   budget_seconds: Optional[float] = None) -> List[Dict[str, str]]:
+        """Location information for (lat, lon) pairs, in order (local lookups need no budget)"""
+        if not coordinates:
+            return []
+        lats, lons = zip(*coordinates)
+        return await pipeline.run("enrich", self.lookup, lats, lons)
+
+
+# Global gazetteer instance (loaded on first use)
+gazetteer = Gazetteer(settings.GAZETTEER_FILE, settings.GAZETTEER_MAX_DISTANCE_KM)
@@ -0,0 +1,254 @@
+"""
+Persistent reverse-geocode cache keyed by quantized coordinates
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[int, int]
+Location = Optional[Dict[str, str]]
+
+# Row-count eviction runs once every this many writes
+EVICTION_CHECK_INTERVAL = 256
+
+
+class GeocodeCache:
+    """
+    Two-tier cache for reverse geocoding results
+    - An in-memory LRU answers repeat lookups without touching disk
+    - A SQLite table keeps labels across restarts and workers, with a TTL
+      and a row limit (rows closest to expiry, i.e. the oldest, are evicted first)
+    Points Nominatim has no address for are cached as negative entries with a
+    shorter TTL; transient lookup failures are never cached
+    Reads never write, so they don't wait for another process (e.g.
+    geocode_dataset.py) holding the write lock; writes give up after a short
+    busy timeout. Request handlers use alookup/astore, which keep the disk
+    tier off the event loop
+    """
+
+    def __init__(self, path: str, decimals: int, ttl_seconds: float, negative_ttl_seconds: float,
+                 max_rows: int, memory_size: int, busy_timeout: float):
+        self.path = path
+        self.scale = 10 ** decimals
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.max_rows = max_rows
+        self.memory_size = memory_size
+        self.busy_timeout = busy_timeout
+        self._memory: "OrderedDict[Key, Tuple[float, Location]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_failed = False
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._writes_since_eviction = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def key(self, lat: float, lon: float) -> Key:
+        """Quantized cache key for a coordinate"""
+        return (round(lat * self.scale), round(lon * self.scale))
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the SQLite file on first use; fall back to memory only if that fails"""
+        if self._conn is None and not self._disk_failed:
+            conn = None
+            try:
+                conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS geocodes ("
+                    " lat_q INTEGER NOT NULL,"
+                    " lon_q INTEGER NOT NULL,"
+                    " location TEXT,"
+                    " expires_at REAL NOT NULL,"
+                    " accessed_at REAL NOT NULL,"  # time written
+                    " PRIMARY KEY (lat_q, lon_q)"
+                    ") WITHOUT ROWID"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS geocodes_expires ON geocodes (expires_at)")
+                conn.commit()
+                self._conn = conn
+                logger.info(f"✅ Geocode cache opened: {self.path}")
+            except sqlite3.Error as e:
+                if conn is not None:
+                    conn.close()
+                if "locked" in str(e):
+                    # Another process is writing; try again on the next lookup
+                    logger.warning(f"Geocode cache file busy ({e}); skipping it for now")
+                else:
+                    self._disk_failed = True
+                    logger.warning(f"Geocode cache file unavailable ({e}); caching in memory only")
+        return self._conn
+
+    def _remember(self, key: Key, expires_at: float, location: Location) -> None:
+        self._memory[key] = (expires_at, location)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, key: Key, now: float) -> Optional[Tuple[bool, Location]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or entry[0] < now:
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            if entry[1] is None:
+                self.negative_hits += 1
+            return True, entry[1]
+
+    def _lookup_disk(self, key: Key, now: float) -> Tuple[bool, Location]:
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is not None:
+                try:
+                    row = conn.execute(
+                        "SELECT location, expires_at FROM geocodes WHERE lat_q = ? AND lon_q = ? AND expires_at >= ?",
+                        (key[0], key[1], now)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Geocode cache read failed: {e}")
+                    row = None
+
+                if row is not None:
+                    location = json.loads(row[0]) if row[0] is not None else None
+                    with self._lock:
+                        self._remember(key, row[1], location)
+                        self.disk_hits += 1
+                        if location is None:
+                            self.negative_hits += 1
+                    return True, location
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def lookup(self, lat: float, lon: float) -> Tuple[bool, Location]:
+        """
+        Return (found, location)
+        location is None for a cached negative result
+        """
+        key = self.key(lat, lon)
+        now = time.time()
+        return self._lookup_memory(key, now) or self._lookup_disk(key, now)
+
+    async def alookup(self, lat: float, lon: float) -> Tuple[bool, Location]:
+        """lookup() that reads the SQLite file on a worker thread"""
+        key = self.key(lat, lon)
+        now = time.time()
+        return self._lookup_memory(key, now) or await asyncio.to_thread(self._lookup_disk, key, now)
+
+    def _store_memory(self, key: Key, location: Location) -> Tuple[float, float]:
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if location is not None else self.negative_ttl_seconds)
+        with self._lock:
+            self._remember(key, expires_at, location)
+            self.writes += 1
+        return now, expires_at
+
+    def _store_disk(self, key: Key, location: Location, now: float, expires_at: float) -> None:
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO geocodes (lat_q, lon_q, location, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key[0], key[1], json.dumps(location) if location is not None else None, expires_at, now)
+                )
+                conn.commit()
+
+                self._writes_since_eviction += 1
+                if self._writes_since_eviction >= EVICTION_CHECK_INTERVAL:
+                    self._writes_since_eviction = 0
+                    self._evict(conn, now)
+            except sqlite3.Error as e:
+                # Another process held the write lock past the busy timeout;
+                # the label stays in memory and is looked up again after a restart
+                conn.rollback()
+                logger.warning(f"Geocode cache write failed: {e}")
+
+    def store(self, lat: float, lon: float, location: Location) -> None:
+        """Cache a lookup result (None records that the point has no address)"""
+        key = self.key(lat, lon)
+        self._store_disk(key, location, *self._store_memory(key, location))
+
+    async def astore(self, lat: float, lon: float, location: Location) -> None:
+        """store() that writes the SQLite file on a worker thread"""
+        key = self.key(lat, lon)
+        await asyncio.to_thread(self._store_disk, key, location, *self._store_memory(key, location))
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        """Drop expired rows, then the rows closest to expiry past max_rows"""
+        removed = conn.execute("DELETE FROM geocodes WHERE expires_at < ?", (now,)).rowcount
+        (rows,) = conn.execute("SELECT COUNT(*) FROM geocodes").fetchone()
+        if rows > self.max_rows:
+            removed += conn.execute(
+                "DELETE FROM geocodes WHERE (lat_q, lon_q) IN"
+                " (SELECT lat_q, lon_q FROM geocodes ORDER BY expires_at LIMIT ?)",
+                (rows - self.max_rows,)
+            ).rowcount
+        conn.commit()
+        self.evictions += removed
+
+    def clear(self) -> None:
+        """Remove every cached label from both tiers"""
+        with self._lock:
+            self._memory.clear()
+        with self._disk_lock:
+            conn = self._connection()
+            if conn is not None:
+                conn.execute("DELETE FROM geocodes")
+                conn.commit()
+
+    def close(self) -> None:
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters for monitoring"""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "path": self.path if self._conn is not None else None,
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+        }
+
+
+# Global reverse-geocode cache
+geocode_cache = GeocodeCache(
+    # Relative paths resolve against ml-model/, like the model and dataset, so the
+    # server and geocode_dataset.py share one file whatever directory they start in
+    path=os.path.join(os.path.dirname(__file__), "..", settings.GEOCODE_CACHE_FILE),
+    decimals=settings.GEOCODE_CACHE_DECIMALS,
+    ttl_seconds=settings.GEOCODE_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.GEOCODE_NEGATIVE_TTL_SECONDS,
+    max_rows=settings.GEOCODE_CACHE_MAX_ROWS,
+    memory_size=settings.GEOCODE_MEMORY_CACHE_SIZE,
+    busy_timeout=settings.GEOCODE_CACHE_BUSY_TIMEOUT_SECONDS
+)
@@ -0,0 +1,267 @@
+"""
+Asynchronous reverse geocoding against OpenStreetMap Nominatim
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from .config import settings
+from .geocode_cache import GeocodeCache, geocode_cache
+from .rate_limiter import RateLimitQueueFull, create_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+
+# User agent header (required by Nominatim)
+NOMINATIM_HEADERS = {
+    "User-Agent": "HydrogenSiteRecommender/1.0"
+}
+
+
+def nominatim_params(lat: float, lon: float) -> Dict[str, Any]:
+    """Query parameters for a Nominatim reverse lookup"""
+    return {
+        "lat": lat,
+        "lon": lon,
+        "format": "json",
+        "addressdetails": 1,
+        "accept-language": "en"
+    }
+
+
+def parse_nominatim(data: Dict[str, Any]) -> Dict[str, str]:
+    """Extract location information from a Nominatim reverse response"""
+    address = data.get("address", {})
+
+    return {
+        "display_name": data.get("display_name", "Unknown location"),
+        "city": address.get("city") or address.get("town") or address.get("village") or "Unknown city",
+        "state": address.get("state") or "Unknown state",
+        "country": address.get("country") or "Unknown country",
+        "postcode": address.get("postcode") or "",
+        "district": address.get("district") or address.get("county") or ""
+    }
+
+
+def location_from_response(data: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Location for a Nominatim response, or None when it has no address for the point"""
+    if "error" in data:
+        return None
+    return parse_nominatim(data)
+
+
+def fallback_location(lat: float, lon: float) -> Dict[str, str]:
+    """Placeholder location used when a lookup fails"""
+    return {
+        "display_name": f"Location at {lat:.4f}, {lon:.4f}",
+        "city": "Unknown city",
+        "state": "Unknown state",
+        "country": "Unknown country",
+        "postcode": "",
+        "district": ""
+    }
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing upstream
+    - closed: calls go through; failure_threshold consecutive failures open the circuit
+    - open: calls are refused until reset_seconds have passed
+    - half_open: a single probe call decides whether to close or reopen
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def is_open(self) -> bool:
+        """Whether calls are currently refused (without claiming a half-open probe)"""
+        return self.state == "open" and time.monotonic() - self.opened_at < self.reset_seconds
+
+    def allow(self) -> bool:
+        """Whether a call may go to the upstream now"""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = "half_open"
+            self._probe_in_flight = False
+
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                logger.warning(f"⚠️  Geocoding circuit opened after {self.failures} failures")
+                self.times_opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected
+        }
+
+
+class GeocodingClient:
+    """
+    Non-blocking Nominatim client with a shared rate limiter, circuit breaker
+    and deduplication of concurrent identical lookups
+    """
+
+    def __init__(self, cache: GeocodeCache):
+        # GEOCODING_RATE_LIMIT is the minimum number of seconds between requests,
+        # enforced across every worker process on the host
+        self.limiter = create_rate_limiter(
+            settings.GEOCODING_RATE_LIMIT, settings.GEOCODING_RATE_LIMIT_FILE, settings.GEOCODING_MAX_QUEUE_SECONDS
+        )
+        self.breaker = CircuitBreaker(
+            failure_threshold=settings.GEOCODING_BREAKER_FAILURES,
+            reset_seconds=settings.GEOCODING_BREAKER_RESET_SECONDS
+        )
+        self.cache = cache
+        self._client: Optional[httpx.AsyncClient] = None
+        self._inflight: Dict[Tuple[int, int], asyncio.Future] = {}
+        self.upstream_requests = 0
+        self.deduplicated = 0
+        self.rate_limited = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=NOMINATIM_HEADERS,
+                timeout=settings.GEOCODING_TIMEOUT
+            )
+        return self._client
+
+    async def reverse_geocode(self, lat: float, lon: float) -> Dict[str, str]:
+        """Convert coordinates to location information without blocking the event loop"""
+        found, location_info = await self.cache.alookup(lat, lon)
+        if found:
+            return location_info or fallback_location(lat, lon)
+
+        # Cached labels are still served while the circuit is open; the rest fall back
+        if self.breaker.is_open():
+            self.breaker.rejected += 1
+            return fallback_location(lat, lon)
+
+        # Concurrent lookups for the same cache cell share one upstream call. The call
+        # runs as its own task, so a caller whose budget runs out doesn't cancel it
+        # for the others (and a finished call still fills the cache)
+        key = self.cache.key(lat, lon)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(lat, lon))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.deduplicated += 1
+
+        return await asyncio.shield(task)
+
+    async def _fetch(self, lat: float, lon: float) -> Dict[str, str]:
+        """Look a coordinate up upstream, respecting the rate limit and circuit breaker"""
+        try:
+            await self.limiter.acquire()
+
+            # The circuit may have opened while this call waited its turn
+            if not self.breaker.allow():
+                return fallback_location(lat, lon)
+
+            self.upstream_requests += 1
+            try:
+                response = await self.client.get(NOMINATIM_REVERSE_URL, params=nominatim_params(lat, lon))
+                response.raise_for_status()
+                data = response.json()
+            except Exception:
+                self.breaker.record_failure()
+                raise
+            self.breaker.record_success()
+
+            location_info = location_from_response(data)
+            await self.cache.astore(lat, lon, location_info)
+            if location_info is None:
+                logger.info(f"No address found for {lat}, {lon}")
+                return fallback_location(lat, lon)
+
+            logger.info(f"Reverse geocoded {lat}, {lon} to {location_info['city']}, {location_info['state']}")
+            return location_info
+
+        except RateLimitQueueFull:
+            # More lookups are queued than the rate limit can serve in time
+            self.rate_limited += 1
+            return fallback_location(lat, lon)
+
+        except Exception as e:
+            logger.warning(f"Reverse geocoding failed for {lat}, {lon}: {e}")
+            return fallback_location(lat, lon)
+
+    async def reverse_geocode_many(self, coordinates: List[Tuple[float, float]],
+                                   budget_seconds: Optional[float] = None) -> List[Dict[str, str]]:
+        """
+        Location information for (lat, lon) pairs, in order
+        Lookups still pending when budget_seconds runs out are cancelled and get
+        fallback labels, so a slow upstream returns partial labels instead of stalling
+        """
+        tasks = [asyncio.ensure_future(self.reverse_geocode(lat, lon)) for lat, lon in coordinates]
+        if not tasks:
+            return []
+
+        done, pending = await asyncio.wait(tasks, timeout=budget_seconds)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Geocoding budget of {budget_seconds}s spent; {len(pending)} of {len(tasks)} sites unlabelled")
+
+        return [
+            task.result() if task in done else fallback_location(lat, lon)
+            for task, (lat, lon) in zip(tasks, coordinates)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream call counters for monitoring"""
+        return {
+            "upstream_requests": self.upstream_requests,
+            "in_flight": len(self._inflight),
+            "deduplicated": self.deduplicated,
+            "rate_limited": self.rate_limited,
+            "circuit": self.breaker.stats()
+        }
+
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool and rate limit file"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if hasattr(self.limiter, "close"):
+            self.limiter.close()
+
+
+# Global geocoding client instance
+geocoding_client = GeocodingClient(geocode_cache)
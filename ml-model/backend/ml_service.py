@@ -8,39 +8,147 @@ import joblib
 import pandas as pd
 import numpy as np
 import requests
-from shapely.geometry import Point, Polygon
+from shapely.geometry import Polygon
 from typing import List, Tuple, Optional, Dict, Any
 import logging
 
+from .booster import BoosterModel, booster_path, load_booster
+from .columnar import columnar_path, load_columnar
 from .config import settings
+from .geocoding import (
+    NOMINATIM_HEADERS, NOMINATIM_REVERSE_URL, fallback_location, geocoding_client,
+    location_from_response, nominatim_params
+)
+from .geocode_cache import geocode_cache
+from .gazetteer import gazetteer
+from .pipeline import pipeline
+from .ranking import ScoreGridIndex, top_k_positions
+from .serialization import LOCATION_FIELDS
+from .shared_segment import MANIFEST_FILE, load_or_create_segment, segment_key
+from .site_store import SiteStore, read_sites_csv
+from .spatial import SiteIndex, build_polygon, haversine_km, points_in_polygon
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL), format=settings.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
+class ServingSnapshot:
+    """
+    Everything a request reads: the model, the scored sites and their indexes
+    A published snapshot is never modified. Loading builds a new one and swaps
+    it in with a single assignment, so a request that pinned the previous one
+    finishes on it and never mixes model versions
+    """
+    
+    FIELDS = {
+        "version": 0,
+        "model": None,
+        "model_loaded": False,
+        "model_signature": None,
+        "store": None,
+        "site_index": None,
+        "score_grid": None,
+        "dataset_loaded": False,
+        "dataset_signature": None,
+        "scored_signature": None,
+        "dataset_shared": False
+    }
+    
+    def __init__(self, **values):
+        for name, default in self.FIELDS.items():
+            setattr(self, name, values.get(name, default))
+    
+    def replace(self, **changes) -> "ServingSnapshot":
+        """Copy with some fields changed"""
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        values.update(changes)
+        return ServingSnapshot(**values)
+
+
+def _snapshot_field(name: str) -> property:
+    """MLService attribute read from (and written as a copy of) the current snapshot"""
+    def get(self):
+        return getattr(self.snapshot, name)
+    
+    def set(self, value):
+        self.snapshot = self.snapshot.replace(**{name: value})
+    
+    return property(get, set)
+
+
 class MLService:
     """Service class for ML model operations"""
     
-    def __init__(self):
-        self.model = None
-        self.dataset = None
-        self.model_loaded = False
-        self.dataset_loaded = False
+    model_version = _snapshot_field("version")
+    model = _snapshot_field("model")
+    model_loaded = _snapshot_field("model_loaded")
+    model_signature = _snapshot_field("model_signature")
+    store = _snapshot_field("store")
+    site_index = _snapshot_field("site_index")
+    score_grid = _snapshot_field("score_grid")
+    dataset_loaded = _snapshot_field("dataset_loaded")
+    dataset_signature = _snapshot_field("dataset_signature")
+    scored_signature = _snapshot_field("scored_signature")
+    dataset_shared = _snapshot_field("dataset_shared")
+    
+    def __init__(self, snapshot: Optional[ServingSnapshot] = None, live: bool = True):
+        self.snapshot = snapshot or ServingSnapshot()
         self.startup_time = time.time()
+        # Candidates (live=False) leave older shared segments for the registry to clean up
+        self.live = live
+    
+    @property
+    def shared_segment_key(self) -> Optional[str]:
+        """Key of the shared segment the current snapshot maps, if any"""
+        if not self.dataset_shared or self.scored_signature is None:
+            return None
+        return segment_key(*self.scored_signature)
+    
+    def pinned(self) -> "MLService":
+        """
+        View of the service fixed to the current snapshot
+        Request handlers use it so every stage of a response sees the same model
+        """
+        view = MLService(self.snapshot, live=False)
+        view.startup_time = self.startup_time
+        return view
+    
+    @property
+    def dataset(self) -> Optional[pd.DataFrame]:
+        """
+        Full site table as a pandas dataframe, built on demand from the columnar store
+        Only for admin/sample use; request paths work on store index arrays
+        """
+        return self.store.to_frame() if self.store is not None else None
         
     def load_model(self) -> bool:
         """Load the trained ML model"""
         try:
             model_path = os.path.join(os.path.dirname(__file__), "..", settings.MODEL_FILE)
             
-            if not os.path.exists(model_path):
+            if not os.path.exists(model_path) and not os.path.exists(booster_path(model_path)):
                 logger.warning(f"Model file not found: {model_path}")
                 return False
-                
-            logger.info(f"Loading model from: {model_path}")
-            self.model = joblib.load(model_path)
-            self.model_loaded = True
-            logger.info("✅ Model loaded successfully")
+            
+            # Prefer the native booster written by export_model.py
+            model = load_booster(model_path)
+            if model is not None:
+                artifact_path = booster_path(model_path)
+            else:
+                artifact_path = model_path
+                model = joblib.load(model_path)
+            logger.info(f"Loaded model from: {artifact_path}")
+            
+            self.snapshot = self.snapshot.replace(
+                model=model,
+                model_loaded=True,
+                model_signature=self._artifact_signature(artifact_path),
+                version=self.model_version + 1
+            )
+            logger.info(f"✅ Model loaded successfully (version {self.model_version}, {self.model_format})")
+            
+            # Rescore the dataset for the new model
+            self.score_dataset()
             return True
             
         except Exception as e:
@@ -51,16 +159,39 @@ class MLService:
     def load_dataset(self) -> bool:
         """Load the hydrogen sites dataset"""
         try:
-            dataset_path = os.path.join(os.path.dirname(__file__), "..", settings.DATASET_FILE)
+            dataset_path = self._dataset_path()
+            columnar_dir = columnar_path(dataset_path)
             
-            if not os.path.exists(dataset_path):
+            if os.path.exists(dataset_path):
+                signature = self._artifact_signature(dataset_path)
+            elif os.path.isdir(columnar_dir):
+                signature = self._artifact_signature(os.path.join(columnar_dir, MANIFEST_FILE))
+            else:
                 logger.warning(f"Dataset file not found: {dataset_path}")
                 return False
+            
+            # With the model loaded, attach to the scored arrays shared by all workers
+            if settings.SHARED_DATASET_ENABLED and self.model_loaded:
+                try:
+                    self._load_shared_segment(signature, reuse_store=False)
+                    return True
+                except Exception as e:
+                    logger.warning(f"Shared dataset segment unavailable ({e}); loading a private copy")
                 
-            logger.info(f"Loading dataset from: {dataset_path}")
-            self.dataset = pd.read_csv(dataset_path)
-            self.dataset_loaded = True
-            logger.info(f"✅ Dataset loaded: {len(self.dataset)} sites")
+            store = self._read_dataset()
+            self.snapshot = self.snapshot.replace(
+                store=store,
+                site_index=self._build_spatial_index(store),
+                score_grid=None,
+                scored_signature=None,
+                dataset_shared=False,
+                dataset_loaded=True,
+                dataset_signature=signature
+            )
+            logger.info(f"✅ Dataset loaded: {len(store)} sites ({store.nbytes / 1e6:.1f} MB columnar)")
+            
+            # Score the new dataset with the current model
+            self.score_dataset()
             return True
             
         except Exception as e:
@@ -68,6 +199,138 @@ class MLService:
             self.dataset_loaded = False
             return False
     
+    @staticmethod
+    def _dataset_path() -> str:
+        return os.path.join(os.path.dirname(__file__), "..", settings.DATASET_FILE)
+    
+    def _read_dataset(self) -> SiteStore:
+        """Site table mapped from its columnar copy when current, otherwise parsed from the CSV"""
+        dataset_path = self._dataset_path()
+        store = load_columnar(dataset_path)
+        if store is None:
+            logger.info(f"Loading dataset from: {dataset_path}")
+            store = SiteStore.from_frame(read_sites_csv(dataset_path))
+        return store
+    
+    @staticmethod
+    def _artifact_signature(path: str) -> Tuple[str, float, int]:
+        """Identify an artifact version by path, modification time and size"""
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    
+    def score_dataset(self) -> bool:
+        """
+        Precompute predicted scores and national percentile ranks for every site
+        Runs once per (model, dataset) artifact pair, so requests never run inference
+        """
+        if not (self.model_loaded and self.dataset_loaded):
+            return False
+        
+        signature = (self.model_signature, self.dataset_signature)
+        if signature == self.scored_signature and "predicted_score" in self.store:
+            logger.info("Dataset scores are up to date")
+            return True
+        
+        try:
+            if settings.SHARED_DATASET_ENABLED:
+                self._load_shared_segment(self.dataset_signature, reuse_store=True)
+            else:
+                store = self._scored_copy()
+                self.snapshot = self.snapshot.replace(
+                    store=store, score_grid=self._build_score_grid(store), scored_signature=signature
+                )
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Error scoring dataset: {e}")
+            return False
+    
+    def _score_store(self, store: SiteStore) -> None:
+        """Add predicted_score and score_percentile columns to a store"""
+        start_time = time.time()
+        scores = self._predict_matrix(store.feature_matrix(settings.FEATURES))
+        store.set_column("predicted_score", scores)
+        store.set_column("score_percentile", pd.Series(scores).rank(pct=True).to_numpy() * 100)
+        logger.info(f"✅ Scored {len(store)} sites in {(time.time() - start_time) * 1000:.1f}ms")
+    
+    def _scored_copy(self) -> SiteStore:
+        """Copy of the loaded store scored with the current model"""
+        # Score a copy; the published store may be in use by requests
+        store = self.store.copy()
+        self._score_store(store)
+        return store
+    
+    def _load_shared_segment(self, dataset_signature: Tuple, reuse_store: bool) -> None:
+        """
+        Attach the scored site arrays and score grid shared by all worker processes,
+        building them if this is the first worker to load this (model, dataset) pair
+        reuse_store builds from the already loaded store instead of the dataset file
+        """
+        signature = (self.model_signature, dataset_signature)
+        
+        def build():
+            if reuse_store and self.store is not None:
+                store = self._scored_copy()
+            else:
+                store = self._read_dataset()
+                self._score_store(store)
+            return store, self._build_score_grid(store)
+        
+        store, grid, shared = load_or_create_segment(
+            settings.SHARED_DATASET_DIR, segment_key(*signature), build, remove_stale=self.live
+        )
+        # The same dataset has the same coordinates, so its spatial index still fits
+        site_index = self.site_index if reuse_store and self.site_index is not None else None
+        self.snapshot = self.snapshot.replace(
+            store=store, score_grid=grid, scored_signature=signature, dataset_shared=shared,
+            site_index=site_index or self._build_spatial_index(store),
+            dataset_loaded=True, dataset_signature=dataset_signature
+        )
+        logger.info(
+            f"✅ Dataset ready: {len(store)} sites "
+            f"({store.nbytes / 1e6:.1f} MB columnar, {'shared' if shared else 'private'})"
+        )
+    
+    def _build_spatial_index(self, store: SiteStore) -> SiteIndex:
+        start_time = time.time()
+        site_index = SiteIndex(store.column("lat"), store.column("lon"))
+        logger.info(f"Spatial index built for {len(site_index)} sites in {(time.time() - start_time) * 1000:.1f}ms")
+        return site_index
+    
+    def _build_score_grid(self, store: SiteStore) -> ScoreGridIndex:
+        start_time = time.time()
+        grid = ScoreGridIndex(
+            store.column("lat"),
+            store.column("lon"),
+            store.column("predicted_score"),
+            settings.INDIA_BOUNDS,
+            settings.SCORE_GRID_CELL_DEG
+        )
+        logger.info(
+            f"Score grid built: {grid.n_rows}x{grid.n_cols} cells "
+            f"in {(time.time() - start_time) * 1000:.1f}ms"
+        )
+        return grid
+    
+    def warm_up(self) -> float:
+        """
+        Run one query of each kind so the first requests skip lazy initialisation
+        Returns the time taken in milliseconds
+        """
+        start_time = time.time()
+        bounds = settings.INDIA_BOUNDS
+        lat = (bounds["lat_min"] + bounds["lat_max"]) / 2
+        lon = (bounds["lon_min"] + bounds["lon_max"]) / 2
+        polygon = [
+            [lat - 1, lon - 1], [lat - 1, lon + 1], [lat + 1, lon + 1], [lat + 1, lon - 1]
+        ]
+        
+        positions, _, _, _ = self.recommend_positions(polygon, settings.MAX_RECOMMENDATIONS)
+        self.site_records(positions)
+        self.get_sites_within_radius(lat, lon, 50)
+        self.get_nearest_sites_matching(lat, lon, 5)
+        return (time.time() - start_time) * 1000
+    
     def train_model_if_needed(self) -> bool:
         """Train model if it doesn't exist"""
         try:
@@ -85,88 +348,174 @@ class MLService:
             logger.error(f"❌ Model training failed: {e}")
             return False
     
-    def filter_sites_by_polygon(self, polygon_points: List[List[float]]) -> pd.DataFrame:
-        """Filter sites within the specified polygon"""
+    def _polygon_positions(self, polygon_points: List[List[float]]) -> np.ndarray:
+        """Positional indices of dataset sites inside the polygon"""
+        # Create prepared polygon (shapely uses lon, lat order)
+        polygon = build_polygon(polygon_points)
+        
+        if self.site_index is not None:
+            # Index yields bbox candidates, exact containment runs only on those
+            return self.site_index.query_polygon(polygon)
+        
+        mask = points_in_polygon(polygon, self.store.column("lat"), self.store.column("lon"))
+        return np.flatnonzero(mask)
+    
+    def _predict_matrix(self, X: np.ndarray) -> np.ndarray:
+        """Run the model over a feature matrix ordered like settings.FEATURES"""
+        if isinstance(self.model, BoosterModel) and self.model.features == settings.FEATURES:
+            return self.model.predict(X)
+        # The pipeline was fitted on a dataframe, so keep the feature names
+        return self.model.predict(pd.DataFrame(X, columns=settings.FEATURES))
+    
+    @property
+    def model_format(self) -> Optional[str]:
+        """Loaded model kind: "booster" (native XGBoost) or "pipeline" (pickled sklearn)"""
+        if not self.model_loaded:
+            return None
+        return "booster" if isinstance(self.model, BoosterModel) else "pipeline"
+    
+    def top_sites_in_polygon(self, polygon_points: List[List[float]], k: int) -> Tuple[np.ndarray, int, bool]:
+        """
+        Top-k sites inside the polygon by predicted score, best first
+        Returns (positional indices of the top sites, total number of sites inside the polygon,
+        whether they were ranked); unranked results (no scores, errors) shouldn't be cached
+        """
         try:
             if not self.dataset_loaded:
                 logger.error("Dataset not loaded")
-                return pd.DataFrame()
-            
-            # Create polygon (shapely uses lon, lat order)
-            polygon = Polygon([(lon, lat) for lat, lon in polygon_points])
+                return np.empty(0, dtype=np.intp), 0, False
             
-            # Filter sites within polygon
-            mask = self.dataset.apply(
-                lambda row: polygon.contains(Point(row["lon"], row["lat"])), 
-                axis=1
-            )
-            filtered_df = self.dataset[mask].copy()
-            
-            logger.info(f"Found {len(filtered_df)} sites in polygon")
-            return filtered_df
-            
-        except Exception as e:
-            logger.error(f"Error filtering by polygon: {e}")
-            return pd.DataFrame()
-    
-    def predict_scores(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Predict scores for filtered sites using the trained model"""
-        try:
-            if not self.model_loaded:
-                logger.error("Model not loaded")
-                return df
+            if self.score_grid is not None:
+                # Ranked grid query: cost scales with cells touched plus k, not sites inside
+                positions, _, total = self.score_grid.query(build_polygon(polygon_points), k)
                 
-            df = df.copy()
-            
-            # Ensure all required features exist
-            for col in settings.FEATURES:
-                if col not in df.columns:
-                    df[col] = 0
-            
-            # Handle missing values
-            df[settings.FEATURES] = df[settings.FEATURES].fillna(0)
+                logger.info(f"Selected top {len(positions)} of {total} sites in polygon")
+                return positions, total, True
             
-            # Prepare features for prediction
-            X = df[settings.FEATURES].copy()
+            positions = self._polygon_positions(polygon_points)
             
-            # Make predictions using the trained model
-            predictions = self.model.predict(X)
-            df["predicted_score"] = predictions
+            if "predicted_score" in self.store:
+                scores = self.store.column("predicted_score")[positions]
+            else:
+                logger.error("Site scores not available, model not loaded")
+                return positions[:k], len(positions), False
             
-            # Sort by predicted score
-            df = df.sort_values("predicted_score", ascending=False)
+            # Partial selection over the score array; only the k winners are decoded
+            winners = positions[top_k_positions(scores, k)]
             
-            logger.info(f"Predictions completed for {len(df)} sites")
-            return df
+            logger.info(f"Selected top {len(winners)} of {len(positions)} sites in polygon")
+            return winners, len(positions), True
             
         except Exception as e:
-            logger.error(f"Error predicting scores: {e}")
-            return df
+            logger.error(f"Error ranking sites in polygon: {e}")
+            return np.empty(0, dtype=np.intp), 0, False
+    
+    def recommend_positions(self, polygon_points: List[List[float]], k: int) -> Tuple[np.ndarray, int, bool, bool]:
+        """
+        Ranked recommendation for a polygon
+        Returns (positional indices, total sites found, whether they are inside the polygon,
+        whether the result is complete); falls back to the nearest sites when the polygon
+        contains none. Incomplete results come from a missing model or an error
+        """
+        positions, total, ranked = self.top_sites_in_polygon(polygon_points, k)
+        if total > 0:
+            return positions, total, True, ranked
+        
+        positions, distances_km = self.get_nearest_sites(polygon_points)
+        # An empty polygon is a valid answer only if the ranking itself succeeded
+        complete = ranked and len(positions) > 0 and not np.isnan(distances_km).any()
+        return positions, len(positions), False, complete
+    
+    def site_records(self, positions: np.ndarray, fields: Optional[List[str]] = None,
+                     extra: Optional[Dict[str, np.ndarray]] = None, raw: bool = False) -> List[Dict[str, Any]]:
+        """Decode the given sites into response-ready dicts, in order"""
+        return self.store.records(positions, fields=fields, extra=extra, raw=raw)
     
-    def get_nearest_sites(self, polygon_points: List[List[float]], n: int = 5) -> pd.DataFrame:
-        """Get nearest sites if no sites found in polygon"""
+    def site_coordinates(self, positions: np.ndarray) -> List[Tuple[float, float]]:
+        """(lat, lon) pairs for the given sites, in order"""
+        return list(zip(
+            self.store.column("lat")[positions].tolist(),
+            self.store.column("lon")[positions].tolist()
+        ))
+    
+    def get_nearest_sites(self, polygon_points: List[List[float]], n: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get nearest sites if no sites found in polygon
+        Returns (positional indices, distances in km), nearest first
+        """
         try:
             if not self.dataset_loaded:
-                return pd.DataFrame()
+                return np.empty(0, dtype=np.intp), np.empty(0)
                 
             # Calculate centroid of polygon
             centroid_lat = sum(point[0] for point in polygon_points) / len(polygon_points)
             centroid_lon = sum(point[1] for point in polygon_points) / len(polygon_points)
             
-            # Calculate distances to centroid
-            self.dataset["distance_to_centroid"] = np.sqrt(
-                (self.dataset["lat"] - centroid_lat) ** 2 + 
-                (self.dataset["lon"] - centroid_lon) ** 2
-            )
+            if self.site_index is not None:
+                # Read-only haversine kNN query against the ball tree
+                positions, distances_km = self.site_index.nearest(centroid_lat, centroid_lon, n)
+            else:
+                distances = haversine_km(
+                    centroid_lat, centroid_lon,
+                    self.store.column("lat"),
+                    self.store.column("lon")
+                )
+                positions = np.argsort(distances)[:n]
+                distances_km = distances[positions]
             
-            # Return nearest sites
-            nearest_sites = self.dataset.nsmallest(n, "distance_to_centroid")
-            logger.info(f"Returning {len(nearest_sites)} nearest sites")
-            return nearest_sites
+            logger.info(f"Returning {len(positions)} nearest sites")
+            return positions, distances_km
             
         except Exception as e:
             logger.error(f"Error getting nearest sites: {e}")
-            return self.dataset.head(n) if self.dataset_loaded else pd.DataFrame()
+            if not self.dataset_loaded:
+                return np.empty(0, dtype=np.intp), np.empty(0)
+            positions = np.arange(min(n, len(self.store)))
+            return positions, np.full(len(positions), np.nan)
+    
+    def attribute_mask(self, min_capacity: Optional[float] = None, 
+                       max_land_cost: Optional[float] = None,
+                       positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Columnar predicate mask for attribute filters, over all sites or the given positions"""
+        rows = slice(None) if positions is None else positions
+        mask = np.ones(len(self.store) if positions is None else len(positions), dtype=bool)
+        if min_capacity is not None:
+            mask &= self.store.column("capacity")[rows] >= min_capacity
+        if max_land_cost is not None:
+            mask &= self.store.column("land_cost")[rows] <= max_land_cost
+        return mask
+    
+    def get_sites_within_radius(self, lat: float, lon: float, radius_km: float,
+                                min_capacity: Optional[float] = None,
+                                max_land_cost: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get all sites within radius_km of a point that satisfy the attribute filters
+        Returns (positional indices, distances in km), nearest first
+        """
+        if not self.dataset_loaded:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        
+        positions, distances_km = self.site_index.within_radius(lat, lon, radius_km)
+        keep = self.attribute_mask(min_capacity, max_land_cost, positions)
+        
+        logger.info(f"Found {keep.sum()} sites within {radius_km} km of {lat}, {lon}")
+        return positions[keep], distances_km[keep]
+    
+    def get_nearest_sites_matching(self, lat: float, lon: float, k: int,
+                                   min_capacity: Optional[float] = None,
+                                   max_land_cost: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Get the k nearest sites to a point that satisfy the attribute filters
+        Returns (positional indices, distances in km), nearest first
+        """
+        if not self.dataset_loaded:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+        
+        mask = self.attribute_mask(min_capacity, max_land_cost)
+        positions, distances_km = self.site_index.nearest_matching(lat, lon, k, mask)
+        
+        logger.info(f"Returning {len(positions)} nearest matching sites to {lat}, {lon}")
+        return positions, distances_km
     
     def calculate_polygon_area(self, polygon_points: List[List[float]]) -> str:
         """Calculate polygon area in square kilometers"""
@@ -183,11 +532,18 @@ class MLService:
         
         return {
             "model_loaded": self.model_loaded,
+            "model_version": self.model_version,
+            "model_format": self.model_format,
             "dataset_loaded": self.dataset_loaded,
             "model_file": settings.MODEL_FILE,
             "dataset_file": settings.DATASET_FILE,
             "uptime_seconds": uptime,
-            "total_sites": len(self.dataset) if self.dataset_loaded else 0
+            "total_sites": len(self.store) if self.dataset_loaded else 0,
+            "dataset_memory_bytes": self.store.nbytes if self.dataset_loaded else 0,
+            "scores_precomputed": self.scored_signature is not None,
+            "dataset_shared": self.dataset_shared,
+            "geocoder_backend": settings.GEOCODER_BACKEND,
+            "geocoder_circuit": geocoding_client.breaker.state
         }
     
     def get_model_info(self) -> Dict[str, Any]:
@@ -197,104 +553,128 @@ class MLService:
             "features": settings.FEATURES,
             "file": settings.MODEL_FILE,
             "status": "loaded" if self.model_loaded else "not_loaded",
+            "format": self.model_format,
             "parameters": settings.MODEL_PARAMS,
             "geographic_bounds": settings.INDIA_BOUNDS
         }
 
+    @property
+    def geocoder(self):
+        """Reverse geocoding backend selected by GEOCODER_BACKEND"""
+        if settings.GEOCODER_BACKEND == "gazetteer":
+            if not gazetteer.load_attempted:
+                gazetteer.load()
+            return gazetteer
+        if settings.GEOCODER_BACKEND != "nominatim":
+            logger.warning(f"Unknown GEOCODER_BACKEND {settings.GEOCODER_BACKEND!r}; using nominatim")
+        return geocoding_client
+    
     def reverse_geocode(self, lat: float, lon: float) -> Dict[str, str]:
         """
-        Convert coordinates to location name using OpenStreetMap Nominatim
+        Convert coordinates to location name using the local gazetteer or OpenStreetMap Nominatim
+        Blocking variant for scripts; request handlers use the async geocoding client
         Returns: {"display_name": "Full address", "city": "City name", "state": "State name"}
         """
+        if settings.GEOCODER_BACKEND == "gazetteer":
+            return self.geocoder.reverse_geocode(lat, lon)
+        
+        found, location_info = geocode_cache.lookup(lat, lon)
+        if found:
+            return location_info or fallback_location(lat, lon)
+        
         try:
-            # Nominatim API endpoint
-            url = "https://nominatim.openstreetmap.org/reverse"
-            params = {
-                "lat": lat,
-                "lon": lon,
-                "format": "json",
-                "addressdetails": 1,
-                "accept-language": "en"
-            }
-            
-            # Add user agent header (required by Nominatim)
-            headers = {
-                "User-Agent": "HydrogenSiteRecommender/1.0"
-            }
-            
-            response = requests.get(url, params=params, headers=headers, timeout=settings.GEOCODING_TIMEOUT)
+            response = requests.get(
+                NOMINATIM_REVERSE_URL,
+                params=nominatim_params(lat, lon),
+                headers=NOMINATIM_HEADERS,
+                timeout=settings.GEOCODING_TIMEOUT
+            )
             response.raise_for_status()
             
-            data = response.json()
-            
-            # Extract location information
-            address = data.get("address", {})
-            
-            location_info = {
-                "display_name": data.get("display_name", "Unknown location"),
-                "city": address.get("city") or address.get("town") or address.get("village") or "Unknown city",
-                "state": address.get("state") or "Unknown state",
-                "country": address.get("country") or "Unknown country",
-                "postcode": address.get("postcode") or "",
-                "district": address.get("district") or address.get("county") or ""
-            }
+            location_info = location_from_response(response.json())
+            geocode_cache.store(lat, lon, location_info)
+            if location_info is None:
+                logger.info(f"No address found for {lat}, {lon}")
+                return fallback_location(lat, lon)
             
             logger.info(f"Reverse geocoded {lat}, {lon} to {location_info['city']}, {location_info['state']}")
             return location_info
             
         except Exception as e:
             logger.warning(f"Reverse geocoding failed for {lat}, {lon}: {e}")
-            return {
-                "display_name": f"Location at {lat:.4f}, {lon:.4f}",
-                "city": "Unknown city",
-                "state": "Unknown state",
-                "country": "Unknown country",
-                "postcode": "",
-                "district": ""
-            }
-    
-    def add_location_names_to_sites(self, sites_df: pd.DataFrame) -> pd.DataFrame:
+            return fallback_location(lat, lon)
+    
+    def stored_locations(self, positions: np.ndarray) -> Optional[Dict[str, List[Optional[str]]]]:
         """
-        Add location names to sites dataframe using reverse geocoding
+        Location columns written into the dataset by geocode_dataset.py, or None if it has none
+        Rows the job hasn't resolved yet have display_name None
+        """
+        if self.store is None or "display_name" not in self.store.coded:
+            return None
+        
+        return {
+            field: self.store.decode(field, positions).tolist() if field in self.store.coded
+            else [None] * len(positions)
+            for field in LOCATION_FIELDS
+        }
+    
+    def fill_stored_locations(self, sites: List[Dict[str, Any]], positions: np.ndarray) -> List[int]:
+        """
+        Fill location fields from the dataset's stored location columns
+        Returns the indices of the sites that still need reverse geocoding
+        """
+        stored = self.stored_locations(positions)
+        pending = []
+        for i, site in enumerate(sites):
+            if stored is not None and stored["display_name"][i] is not None:
+                for field in LOCATION_FIELDS:
+                    if field in site:
+                        # Empty strings (e.g. no district) come back from the CSV as missing
+                        site[field] = stored[field][i] or ""
+            else:
+                pending.append(i)
+        return pending
+    
+    async def add_location_names_to_sites(self, sites: List[Dict[str, Any]],
+                                          positions: np.ndarray) -> List[Dict[str, Any]]:
+        """
+        Add location names to the site records for the given dataset positions
+        Locations stored in the dataset are a column lookup; only rows without one
+        are reverse geocoded. Only the location fields a record carries are filled,
+        so projections are kept
+        Nominatim lookups are awaited, so the event loop keeps serving other requests
+        while the shared token bucket paces them
         """
         try:
+            if not sites:
+                return sites
+            
+            pending = await pipeline.run("enrich", self.fill_stored_locations, sites, positions)
+            if not pending:
+                return sites
+            
             if not settings.ENABLE_REVERSE_GEOCODING:
                 logger.info("Reverse geocoding is disabled in configuration")
-                return sites_df
-                
-            if sites_df.empty:
-                return sites_df
-                
-            sites_df = sites_df.copy()
+                return sites
             
-            # Add location columns
-            sites_df["city"] = ""
-            sites_df["state"] = ""
-            sites_df["display_name"] = ""
-            sites_df["district"] = ""
+            # The gazetteer answers all sites in one query; the Nominatim client
+            # handles rate limiting to respect Nominatim's terms
+            coordinates = self.site_coordinates(np.asarray(positions)[pending])
+            locations = await self.geocoder.reverse_geocode_many(
+                coordinates, budget_seconds=settings.GEOCODING_REQUEST_BUDGET_SECONDS
+            )
             
-            # Process each site (with rate limiting to respect Nominatim's terms)
-            for idx, row in sites_df.iterrows():
-                lat, lon = row["lat"], row["lon"]
-                
-                # Get location info
-                location_info = self.reverse_geocode(lat, lon)
-                
-                # Update dataframe
-                sites_df.at[idx, "city"] = location_info["city"]
-                sites_df.at[idx, "state"] = location_info["state"]
-                sites_df.at[idx, "display_name"] = location_info["display_name"]
-                sites_df.at[idx, "district"] = location_info["district"]
-                
-                # Rate limiting: Nominatim allows max 1 request per second
-                time.sleep(settings.GEOCODING_RATE_LIMIT)
+            for i, location_info in zip(pending, locations):
+                for field in LOCATION_FIELDS:
+                    if field in sites[i]:
+                        sites[i][field] = location_info[field]
             
-            logger.info(f"Added location names to {len(sites_df)} sites")
-            return sites_df
+            logger.info(f"Added location names to {len(pending)} sites")
+            return sites
             
         except Exception as e:
             logger.error(f"Error adding location names: {e}")
-            return sites_df
+            return sites
 
 # Global ML service instance
 ml_service = MLService()
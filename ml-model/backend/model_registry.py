@@ -0,0 +1,155 @@
+"""
+Versioned model hot-swap
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+import numpy as np
+import pandas as pd
+
+from .config import settings
+from .ml_service import MLService, ml_service
+from .shared_segment import remove_segment, remove_stale_segments
+
+logger = logging.getLogger(__name__)
+
+
+class ReloadInProgress(Exception):
+    """Raised when a reload is requested while another one runs"""
+
+
+class ModelRejected(Exception):
+    """Raised when a new model fails to load or fails its sanity checks"""
+
+
+class ModelRegistry:
+    """
+    Loads a new model into a complete serving snapshot (model, site scores,
+    score grid, version) on a background thread while requests keep using the
+    live one, warms it, checks its scores and only then publishes it with one
+    assignment. In-flight requests finish on the snapshot they pinned; a
+    rejected model never goes live
+    """
+
+    def __init__(self, service: MLService, history_size: int):
+        self.service = service
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+
+    @property
+    def reloading(self) -> bool:
+        return self._lock.locked()
+
+    def reload(self) -> Dict[str, Any]:
+        """Build, warm, check and publish a snapshot for the current model file"""
+        if not self._lock.acquire(blocking=False):
+            raise ReloadInProgress("a model reload is already in progress")
+
+        start_time = time.time()
+        live = self.service.snapshot
+        record: Dict[str, Any] = {
+            "version": live.version + 1,
+            "model_file": settings.MODEL_FILE,
+            "requested_at": start_time
+        }
+        candidate = None
+        try:
+            # Unchanged dataset fields (store, indexes) are shared with the live snapshot;
+            # its shared segment is kept until the candidate has passed its checks
+            candidate = MLService(live.replace(model=None, model_loaded=False, model_signature=None), live=False)
+            if not candidate.load_model():
+                raise ModelRejected("model file could not be loaded")
+            if live.dataset_loaded and candidate.scored_signature != (candidate.model_signature, candidate.dataset_signature):
+                raise ModelRejected("sites could not be scored with the new model")
+
+            record["warm_up_ms"] = round(candidate.warm_up(), 1)
+            record.update(self._sanity_check(candidate, live))
+
+            # The swap: one reference assignment, atomic for concurrent readers
+            self.service.snapshot = candidate.snapshot
+            if candidate.shared_segment_key is not None:
+                remove_stale_segments(settings.SHARED_DATASET_DIR, candidate.shared_segment_key)
+            for previous in self.history:
+                if previous["status"] == "live":
+                    previous["status"] = "retired"
+            record.update(status="live", build_seconds=round(time.time() - start_time, 3))
+            logger.info(
+                f"✅ Model version {record['version']} live after {record['build_seconds']}s "
+                f"(rank correlation {record.get('rank_correlation')})"
+            )
+            return record
+
+        except ModelRejected as e:
+            record.update(status="rejected", error=str(e))
+            logger.error(f"❌ Model version {record['version']} rejected: {e}")
+            self._discard(candidate, live)
+            raise
+        except Exception as e:
+            record.update(status="failed", error=str(e))
+            logger.error(f"❌ Model reload failed: {e}")
+            self._discard(candidate, live)
+            raise
+        finally:
+            self.history.appendleft(record)
+            self._lock.release()
+
+    def _discard(self, candidate, live) -> None:
+        """Free the shared segment built for a candidate that never went live"""
+        if candidate is None or candidate.snapshot is live:
+            return
+        key = candidate.shared_segment_key
+        if key is not None and key != MLService(live).shared_segment_key:
+            remove_segment(settings.SHARED_DATASET_DIR, key)
+
+    def _sanity_check(self, candidate: MLService, live) -> Dict[str, Any]:
+        """
+        Re-score a batch of sites (which also warms the model), confirm it
+        matches the snapshot's precomputed scores, and compare the ranking
+        with the live model's
+        """
+        if not candidate.dataset_loaded:
+            return {}
+
+        scores = np.asarray(candidate.store.column("predicted_score"), dtype=np.float64)
+        if not np.isfinite(scores).all():
+            raise ModelRejected("model produced non-finite site scores")
+        if np.ptp(scores) == 0:
+            raise ModelRejected("model gives every site the same score")
+
+        batch = min(settings.MODEL_SANITY_BATCH, len(scores))
+        features = candidate.store.feature_matrix(settings.FEATURES)[:batch]
+        rescored = np.asarray(candidate._predict_matrix(features), dtype=np.float32)
+        if not np.allclose(rescored, scores[:batch], rtol=1e-5, atol=1e-5):
+            raise ModelRejected("precomputed site scores don't match the model")
+
+        result: Dict[str, Any] = {"sanity_batch": batch}
+        if live.model_loaded and live.dataset_signature == candidate.dataset_signature and "predicted_score" in live.store:
+            correlation = pd.Series(scores).corr(
+                pd.Series(np.asarray(live.store.column("predicted_score"), dtype=np.float64)),
+                method="spearman"
+            )
+            result["rank_correlation"] = round(float(correlation), 4)
+            if not correlation >= settings.MODEL_SANITY_MIN_RANK_CORRELATION:
+                raise ModelRejected(
+                    f"site ranking correlation {correlation:.3f} with the live model is below "
+                    f"{settings.MODEL_SANITY_MIN_RANK_CORRELATION}"
+                )
+        return result
+
+    def status(self) -> Dict[str, Any]:
+        """Live version and recent reload attempts"""
+        live = self.service.snapshot
+        return {
+            "live_version": live.version,
+            "live_model_file": live.model_signature[0] if live.model_signature else None,
+            "reloading": self.reloading,
+            "history": list(self.history)
+        }
+
+
+# Global model registry
+model_registry = ModelRegistry(ml_service, history_size=settings.MODEL_HISTORY_SIZE)
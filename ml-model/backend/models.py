@@ -6,6 +6,8 @@ from pydantic import BaseModel, Field, validator
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 
+from .config import settings
+
 class PolygonRequest(BaseModel):
     """Request model for polygon coordinates"""
     
@@ -45,6 +47,7 @@ class SiteRecommendation(BaseModel):
     water_availability: Optional[float] = Field(None, description="Water availability percentage")
     land_cost: Optional[float] = Field(None, description="Land cost (₹k)")
     predicted_score: Optional[float] = Field(None, description="ML-predicted site score")
+    score_percentile: Optional[float] = Field(None, description="National percentile rank of the predicted score (0-100)")
     site_id: Optional[str] = Field(None, description="Unique site identifier")
     
     # Location information from reverse geocoding
@@ -64,6 +67,7 @@ class SiteRecommendation(BaseModel):
                 "water_availability": 65.8,
                 "land_cost": 45.2,
                 "predicted_score": 0.87,
+                "score_percentile": 92.4,
                 "site_id": "site_0001",
                 "city": "Bhopal",
                 "state": "Madhya Pradesh",
@@ -72,6 +76,47 @@ class SiteRecommendation(BaseModel):
             }
         }
 
+class SiteAttributeFilters(BaseModel):
+    """Optional attribute predicates applied to point queries"""
+    
+    min_capacity: Optional[float] = Field(None, description="Only sites with capacity >= this value (MW)")
+    max_land_cost: Optional[float] = Field(None, description="Only sites with land cost <= this value (₹k)")
+
+class RadiusQueryRequest(SiteAttributeFilters):
+    """Request model for sites within a radius of a point"""
+    
+    lat: float = Field(..., ge=-90, le=90, description="Latitude of the query point", example=22.4707)
+    lon: float = Field(..., ge=-180, le=180, description="Longitude of the query point", example=70.0577)
+    radius_km: float = Field(
+        ...,
+        gt=0,
+        le=settings.MAX_QUERY_RADIUS_KM,
+        description="Search radius in kilometers",
+        example=50
+    )
+
+class NearestQueryRequest(SiteAttributeFilters):
+    """Request model for the k nearest sites to a point"""
+    
+    lat: float = Field(..., ge=-90, le=90, description="Latitude of the query point", example=22.4707)
+    lon: float = Field(..., ge=-180, le=180, description="Longitude of the query point", example=70.0577)
+    k: int = Field(5, ge=1, le=settings.MAX_NEAREST_SITES, description="Number of sites to return")
+
+class NearbySite(SiteRecommendation):
+    """Site returned by a point query"""
+    
+    distance_km: Optional[float] = Field(None, description="Great-circle distance from the query point (km)")
+
+class SiteQueryResponse(BaseModel):
+    """Response model for radius and nearest point queries"""
+    
+    message: str = Field(..., description="Response message")
+    sites: List[NearbySite] = Field(..., description="Matching sites, nearest first")
+    total_sites_found: int = Field(..., description="Total number of matching sites")
+    query_point: List[float] = Field(..., description="Query point [lat, lon]")
+    processing_time_ms: Optional[float] = Field(None, description="Request processing time in milliseconds")
+    model_version: Optional[str] = Field(None, description="ML model version used")
+
 class PolygonAnalysis(BaseModel):
     """Model for polygon analysis results"""
     
@@ -80,6 +125,26 @@ class PolygonAnalysis(BaseModel):
     status: str = Field(..., description="Analysis status")
     centroid: Optional[List[float]] = Field(None, description="Polygon centroid [lat, lon]")
 
+class EnrichmentInfo(BaseModel):
+    """Where to fetch location names deferred from a recommendation response"""
+    
+    token: str = Field(..., description="Enrichment token")
+    status: str = Field(..., description="pending or complete")
+    pending_sites: int = Field(..., description="Number of sites whose location names are still resolving")
+    results_url: str = Field(..., description="Endpoint returning the locations resolved so far")
+    stream_url: str = Field(..., description="Server-sent events stream of locations as they resolve")
+
+class EnrichmentResponse(BaseModel):
+    """Location names resolved for a deferred enrichment token"""
+    
+    token: str = Field(..., description="Enrichment token")
+    status: str = Field(..., description="pending or complete")
+    total_sites: int = Field(..., description="Number of sites being enriched")
+    resolved_sites: int = Field(..., description="Number of sites resolved so far")
+    locations: List[Dict[str, Any]] = Field(
+        ..., description="Resolved locations with the site's index in recommended_sites and its site_id"
+    )
+
 class MLResponse(BaseModel):
     """Response model for ML recommendations"""
     
@@ -90,6 +155,9 @@ class MLResponse(BaseModel):
     polygon_points_received: List[List[float]] = Field(..., description="Original polygon points")
     processing_time_ms: Optional[float] = Field(None, description="Request processing time in milliseconds")
     model_version: Optional[str] = Field(None, description="ML model version used")
+    enrichment: Optional[EnrichmentInfo] = Field(
+        None, description="Deferred location enrichment (only with enrichment=deferred)"
+    )
     
     class Config:
         schema_extra = {
@@ -119,6 +187,18 @@ class HealthResponse(BaseModel):
     model_file: str = Field(..., description="Model file path")
     dataset_file: str = Field(..., description="Dataset file path")
     uptime_seconds: Optional[float] = Field(None, description="Service uptime in seconds")
+    geocoder_circuit: Optional[str] = Field(None, description="Geocoding circuit breaker state (closed, open, half_open)")
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response model"""
+    
+    ready: bool = Field(..., description="Whether the model and dataset are loaded and warm")
+    state: str = Field(..., description="Warm-up state (idle, running, ready, failed)")
+    current_step: Optional[str] = Field(None, description="Warm-up step in progress (model, dataset, warm)")
+    progress: float = Field(..., description="Fraction of warm-up steps completed")
+    steps: Dict[str, Dict[str, Any]] = Field(..., description="Status and duration in seconds of each warm-up step")
+    elapsed_seconds: float = Field(..., description="Seconds since warm-up started")
+    error: Optional[str] = Field(None, description="Why warm-up failed, if it did")
 
 class InfoResponse(BaseModel):
     """API information response model"""
@@ -0,0 +1,115 @@
+"""
+Bounded worker pool for the CPU-bound stages of request handling
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineOverloaded(Exception):
+    """Raised when the pipeline queue is full"""
+
+
+class PipelineExecutor:
+    """
+    Runs filtering, ranking, decoding and enrichment off the event loop
+    A thread pool is used because the heavy work (numpy, Shapely, scikit-learn,
+    XGBoost) releases the GIL and shares the loaded site index without copies.
+    Submissions past max_queue waiting jobs are refused, so overload surfaces
+    as a fast 503 instead of an ever-growing backlog
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.peak_queued = 0
+        self.rejected = 0
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def _record(self, stage: str, wait_ms: float, run_ms: float) -> None:
+        stats = self.stages.setdefault(stage, {
+            "calls": 0, "total_wait_ms": 0.0, "max_wait_ms": 0.0, "total_run_ms": 0.0, "max_run_ms": 0.0
+        })
+        stats["calls"] += 1
+        stats["total_wait_ms"] += wait_ms
+        stats["max_wait_ms"] = max(stats["max_wait_ms"], wait_ms)
+        stats["total_run_ms"] += run_ms
+        stats["max_run_ms"] = max(stats["max_run_ms"], run_ms)
+
+    async def run(self, stage: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run fn(*args, **kwargs) on the pool and await its result"""
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise PipelineOverloaded(f"{self.queued} jobs already waiting")
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finished_at = time.perf_counter()
+                with self._lock:
+                    self.active -= 1
+                    self._record(stage, (started_at - submitted_at) * 1000, (finished_at - started_at) * 1000)
+
+        future = self._pool.submit(job)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # Cancelling the caller cancels a job that hasn't started; it then
+            # never runs, so take it off the queue here
+            if future.cancelled():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool and per-stage counters for monitoring"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "queued": self.queued,
+                "active": self.active,
+                "peak_queued": self.peak_queued,
+                "rejected": self.rejected,
+                "stages": {
+                    stage: {
+                        "calls": int(s["calls"]),
+                        "avg_wait_ms": s["total_wait_ms"] / s["calls"],
+                        "max_wait_ms": s["max_wait_ms"],
+                        "avg_run_ms": s["total_run_ms"] / s["calls"],
+                        "max_run_ms": s["max_run_ms"]
+                    }
+                    for stage, s in self.stages.items()
+                }
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Global pipeline executor
+pipeline = PipelineExecutor(
+    max_workers=settings.PIPELINE_WORKERS,
+    max_queue=settings.PIPELINE_MAX_QUEUE
+)
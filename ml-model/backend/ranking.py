@@ -0,0 +1,177 @@
+"""
+Ranking helpers for selecting the best-scoring sites
+"""
+
+import heapq
+from typing import Dict, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+
+def top_k_positions(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Positions of the k highest scores, best first
+    Uses a partial partition so only the k winners are fully sorted
+    """
+    n = len(scores)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    if k < n:
+        # NaN scores partition to the end, matching sort_values' NaN placement
+        winners = np.argpartition(-scores, k - 1)[:k]
+    else:
+        winners = np.arange(n)
+
+    # Sort the winners by descending score, breaking ties by position for stable output
+    order = np.lexsort((winners, -scores[winners]))
+    return winners[order]
+
+
+class ScoreGridIndex:
+    """
+    Grid over the dataset bounds where each cell lists its sites by descending score
+    Ranked polygon queries take cells fully inside the polygon straight from their
+    sorted lists, test only sites in boundary cells exactly, and heap-merge the
+    cells until k sites are found
+    """
+
+    # Array attributes that fully describe a built index (see to_arrays / from_arrays)
+    ARRAYS = ("positions", "scores", "lats", "lons", "keys", "cell_start", "cell_bounds")
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray, scores: np.ndarray,
+                 bounds: Dict[str, float], cell_size: float):
+        self.cell_size = cell_size
+        self.lat_min = bounds["lat_min"]
+        self.lon_min = bounds["lon_min"]
+        self.n_rows = max(1, int(np.ceil((bounds["lat_max"] - self.lat_min) / cell_size)))
+        self.n_cols = max(1, int(np.ceil((bounds["lon_max"] - self.lon_min) / cell_size)))
+        n_cells = self.n_rows * self.n_cols
+
+        lats, lons, scores = np.asarray(lats), np.asarray(lons), np.asarray(scores)
+
+        # Sites without coordinates can never fall inside a polygon
+        positions = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        lats, lons, scores = lats[positions], lons[positions], scores[positions]
+
+        # Sites outside the bounds are clipped into edge cells, whose extents grow to cover them
+        cells = self._row(lats) * self.n_cols + self._col(lons)
+
+        # Group sites by cell, best score first within each cell (NaN scores last)
+        order = np.lexsort((-scores, cells))
+        self.positions = positions[order]
+        self.scores = scores[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        self.keys = np.where(np.isnan(self.scores), -np.inf, self.scores)
+        self.cell_start = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=n_cells))])
+
+        # Cell extents: nominal box widened to cover any clipped outliers
+        rows, cols = np.divmod(np.arange(n_cells), self.n_cols)
+        box_lat_min = self.lat_min + rows * cell_size
+        box_lon_min = self.lon_min + cols * cell_size
+        box_lat_max = box_lat_min + cell_size
+        box_lon_max = box_lon_min + cell_size
+        np.minimum.at(box_lat_min, cells, lats)
+        np.minimum.at(box_lon_min, cells, lons)
+        np.maximum.at(box_lat_max, cells, lats)
+        np.maximum.at(box_lon_max, cells, lons)
+        self.cell_bounds = np.column_stack((box_lon_min, box_lat_min, box_lon_max, box_lat_max))
+        self.cell_boxes = shapely.box(*self.cell_bounds.T)
+
+    def to_arrays(self) -> Tuple[Dict[str, float], Dict[str, np.ndarray]]:
+        """Grid parameters and arrays, e.g. for writing to a shared segment"""
+        meta = {
+            "cell_size": self.cell_size,
+            "lat_min": self.lat_min,
+            "lon_min": self.lon_min,
+            "n_rows": self.n_rows,
+            "n_cols": self.n_cols
+        }
+        return meta, {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, meta: Dict[str, float], arrays: Dict[str, np.ndarray]) -> "ScoreGridIndex":
+        """Rebuild an index from to_arrays() output without copying the arrays"""
+        index = cls.__new__(cls)
+        index.cell_size = meta["cell_size"]
+        index.lat_min = meta["lat_min"]
+        index.lon_min = meta["lon_min"]
+        index.n_rows = int(meta["n_rows"])
+        index.n_cols = int(meta["n_cols"])
+        for name in cls.ARRAYS:
+            setattr(index, name, arrays[name])
+        index.cell_boxes = shapely.box(*np.asarray(index.cell_bounds).T)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _row(self, lats: np.ndarray) -> np.ndarray:
+        rows = np.floor((lats - self.lat_min) / self.cell_size)
+        return np.clip(rows, 0, self.n_rows - 1).astype(np.intp)
+
+    def _col(self, lons: np.ndarray) -> np.ndarray:
+        cols = np.floor((lons - self.lon_min) / self.cell_size)
+        return np.clip(cols, 0, self.n_cols - 1).astype(np.intp)
+
+    def query(self, polygon: Polygon, k: int) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Top-k sites strictly inside a prepared polygon
+        Returns (positional indices best first, their scores, total sites inside)
+        """
+        lon_min, lat_min, lon_max, lat_max = polygon.bounds
+        rows = np.arange(self._row(np.array([lat_min]))[0], self._row(np.array([lat_max]))[0] + 1)
+        cols = np.arange(self._col(np.array([lon_min]))[0], self._col(np.array([lon_max]))[0] + 1)
+        cells = (rows[:, None] * self.n_cols + cols[None, :]).ravel()
+
+        # Skip empty cells before touching any geometry
+        starts, ends = self.cell_start[cells], self.cell_start[cells + 1]
+        occupied = ends > starts
+        cells, starts, ends = cells[occupied], starts[occupied], ends[occupied]
+
+        boxes = self.cell_boxes[cells]
+        interior = shapely.contains_properly(polygon, boxes)
+        boundary = ~interior & shapely.intersects(polygon, boxes)
+
+        total = int((ends[interior] - starts[interior]).sum())
+        heap = []
+
+        # Interior cells: every site is inside, so each cell's sorted list is used as-is
+        for start, end in zip(starts[interior], ends[interior]):
+            heap.append((-self.keys[start], start, start, end, None))
+
+        # Boundary cells: exact containment on their sites; hits stay in score order per cell
+        if boundary.any():
+            lengths = ends[boundary] - starts[boundary]
+            offsets = np.cumsum(lengths) - lengths
+            candidates = np.repeat(starts[boundary] - offsets, lengths) + np.arange(lengths.sum())
+            inside = shapely.contains_xy(polygon, self.lons[candidates], self.lats[candidates])
+
+            hits = candidates[inside]
+            hit_counts = np.add.reduceat(inside.astype(np.intp), offsets)
+            hit_ends = np.cumsum(hit_counts)
+            hit_starts = hit_ends - hit_counts
+            total += len(hits)
+
+            for start, end in zip(hit_starts, hit_ends):
+                if end > start:
+                    heap.append((-self.keys[hits[start]], hits[start], start, end, hits))
+
+        # k-way merge: the heap head is always the best remaining site across all cells,
+        # so the merge stops as soon as k sites have been taken
+        heapq.heapify(heap)
+        selected = []
+        while heap and len(selected) < k:
+            _, sorted_index, pos, end, ids = heapq.heappop(heap)
+            selected.append(sorted_index)
+            pos += 1
+            if pos < end:
+                next_index = pos if ids is None else ids[pos]
+                heapq.heappush(heap, (-self.keys[next_index], next_index, pos, end, ids))
+
+        selected = np.array(selected, dtype=np.intp)
+        return self.positions[selected], self.scores[selected], total
@@ -0,0 +1,190 @@
+"""
+Rate limiters for upstream geocoding requests
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import threading
+import time
+from typing import Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitQueueFull(Exception):
+    """Raised when the next request slot is further away than the limiter's max_wait"""
+
+
+class TokenBucket:
+    """
+    Async token bucket shared by every geocoding call in the process
+    Waiters queue on a lock, so lookups are released in arrival order at the
+    configured rate while the event loop keeps serving other requests.
+    A lookup that would wait longer than max_wait is refused instead of queued
+    """
+
+    def __init__(self, rate: float, max_wait: float, capacity: float = 1.0):
+        self.rate = rate
+        self.max_wait = max_wait
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.waiting = 0
+        self.rejected = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        if self.waiting / self.rate > self.max_wait:
+            self.rejected += 1
+            raise RateLimitQueueFull(f"{self.waiting} geocoding lookups already waiting")
+
+        self.waiting += 1
+        try:
+            async with self._lock:
+                self._refill()
+                if self.tokens < 1:
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+                    self._refill()
+                self.tokens -= 1
+        finally:
+            self.waiting -= 1
+
+    def acquire_blocking(self) -> None:
+        """Wait for a token in a synchronous script"""
+        self._refill()
+        if self.tokens < 1:
+            time.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+
+class FileRateLimiter:
+    """
+    Rate limiter shared by every process on the host (all uvicorn workers and
+    the offline geocoding job)
+    The next free request slot is stored in a small file. A caller takes an
+    exclusive lock, reserves max(now, next slot), pushes the next slot one
+    interval later and releases the lock, then sleeps until its own slot.
+    Slots are handed out in arrival order across processes, and an idle
+    upstream is used immediately instead of after a fixed sleep.
+    Slots are never reserved more than max_wait ahead, so the queue stays
+    bounded when lookups arrive faster than the rate; the file also records
+    when it was last written, so a wall clock stepped backwards shifts the
+    queue instead of stalling or resetting it
+    """
+
+    def __init__(self, path: str, interval: float, max_wait: float):
+        self.path = path
+        self.interval = interval
+        self.max_wait = max_wait
+        self.rejected = 0
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        # flock doesn't exclude threads sharing the descriptor, so they take this first
+        self._lock = threading.Lock()
+
+    def _file(self) -> int:
+        # flock locks belong to the open file, so a worker forked from a parent
+        # that already opened it must open its own copy to be excluded
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def reserve(self) -> Optional[float]:
+        """Reserve the next request slot; returns its wall-clock time, or None if the queue is full"""
+        with self._lock:
+            return self._reserve()
+
+    def _reserve(self) -> Optional[float]:
+        fd = self._file()
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            raw = os.pread(fd, 16, 0)
+            if len(raw) == 16:
+                next_slot, written_at = struct.unpack("dd", raw)
+            else:
+                # Empty file, or one written before the write time was recorded
+                next_slot, written_at = (struct.unpack("d", raw[:8])[0] if len(raw) >= 8 else 0.0), 0.0
+
+            now = time.time()
+            if now < written_at:
+                # Wall clock stepped backwards since the last reservation; keep the
+                # pending slots the same distance from now
+                logger.warning(f"⚠️  Wall clock moved back {written_at - now:.1f}s; shifting geocoding slots")
+                next_slot -= written_at - now
+
+            slot = max(now, next_slot)
+            if slot - now > self.max_wait:
+                return None
+
+            os.pwrite(fd, struct.pack("dd", slot + self.interval, now), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        return slot
+
+    async def acquire(self) -> None:
+        """Wait for this process's turn without blocking the event loop"""
+        # Another process may hold the file lock; wait for it on a worker thread
+        slot = await asyncio.to_thread(self.reserve)
+        if slot is None:
+            self.rejected += 1
+            raise RateLimitQueueFull(f"next geocoding slot is more than {self.max_wait:.0f}s away")
+
+        delay = slot - time.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def acquire_blocking(self) -> None:
+        """Wait for a turn in a synchronous script (for the queue to drain first if it is full)"""
+        slot = self.reserve()
+        while slot is None:
+            time.sleep(self.interval)
+            slot = self.reserve()
+
+        delay = slot - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+
+def create_rate_limiter(interval: float, path: str, max_wait: float) -> Union[FileRateLimiter, TokenBucket]:
+    """
+    Cross-process limiter when file locks are available, otherwise an
+    in-process token bucket (each worker then enforces the limit on its own)
+    Lookups that would wait more than max_wait seconds raise RateLimitQueueFull
+    """
+    if fcntl is not None:
+        try:
+            limiter = FileRateLimiter(path, interval, max_wait)
+            # Open the state file now so an unusable path falls back at startup
+            limiter._file()
+            logger.info(f"✅ Geocoding rate limit shared across processes via {path}")
+            return limiter
+        except OSError as e:
+            logger.warning(f"Shared rate limit file unavailable ({e}); limiting per process")
+    else:
+        logger.warning("File locks unavailable on this platform; geocoding rate limited per process")
+
+    return TokenBucket(rate=1.0 / interval, max_wait=max_wait)
@@ -2,17 +2,30 @@
 API routes for Hydrogen Site Recommender
 """
 
+import asyncio
+import hashlib
 import time
-from typing import List
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+from typing import List, Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 
 from .models import (
-    PolygonRequest, MLResponse, SiteRecommendation, 
-    PolygonAnalysis, HealthResponse, InfoResponse
+    PolygonRequest, MLResponse, HealthResponse, InfoResponse,
+    RadiusQueryRequest, NearestQueryRequest, NearbySite, SiteQueryResponse,
+    EnrichmentResponse, ReadinessResponse
 )
-from .ml_service import ml_service
+from .ml_service import MLService, ml_service
+from .cache import canonical_polygon, result_cache
+from .geocode_cache import geocode_cache
+from .geocoding import geocoding_client
+from .enrichment import decode_token, encode_token, enrichment_store, sse_event
+from .model_registry import ModelRejected, ReloadInProgress, model_registry
+from .pipeline import PipelineOverloaded, pipeline
+from .warmup import warmup
 from .config import settings
+from .serialization import LOCATION_FIELDS, parse_fields, wants_location
 
 router = APIRouter()
 
@@ -20,6 +33,41 @@ def get_ml_service():
     """Dependency to get ML service instance"""
     return ml_service
 
+def _ensure_loaded(service: MLService, need_model: bool = True) -> None:
+    """Load the dataset and (optionally) the model if a request arrives before they are ready"""
+    if need_model and not service.model_loaded:
+        service.load_model()
+        if not service.model_loaded:
+            service.train_model_if_needed()
+    
+    if not service.dataset_loaded:
+        service.load_dataset()
+
+def _overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy processing other requests; retry shortly",
+        headers={"Retry-After": "1"}
+    )
+
+def _warming_up() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Service is warming up; retry shortly (progress at /ready)",
+        headers={"Retry-After": str(settings.WARMUP_RETRY_AFTER_SECONDS)}
+    )
+
+def readiness_response() -> JSONResponse:
+    """200 once the model and dataset are ready, 503 with Retry-After and progress until then"""
+    status = ReadinessResponse(**warmup.status())
+    if status.ready:
+        return JSONResponse(content=status.dict())
+    return JSONResponse(
+        status_code=503,
+        content=status.dict(),
+        headers={"Retry-After": str(settings.WARMUP_RETRY_AFTER_SECONDS)}
+    )
+
 @router.get("/", response_model=dict)
 async def root():
     """Root endpoint - Health check"""
@@ -44,9 +92,15 @@ async def health_check():
         dataset_status="loaded" if ml_service.dataset_loaded else "not_loaded",
         model_file=status["model_file"],
         dataset_file=status["dataset_file"],
-        uptime_seconds=status["uptime_seconds"]
+        uptime_seconds=status["uptime_seconds"],
+        geocoder_circuit=status["geocoder_circuit"]
     )
 
+@router.get("/ready", response_model=ReadinessResponse, responses={503: {"model": ReadinessResponse}})
+async def readiness_check():
+    """Readiness check: warm-up progress, separate from liveness (/health)"""
+    return readiness_response()
+
 @router.get("/info", response_model=InfoResponse)
 async def get_info():
     """Get API information"""
@@ -68,7 +122,14 @@ async def get_info():
             "GET / - Health check",
             "GET /health - Detailed health check",
             "POST /recommend_sites - Main recommendation endpoint",
-            "GET /info - API information"
+            "POST /sites/radius - Sites within a radius of a point",
+            "POST /sites/nearest - Nearest sites to a point",
+            "GET /cache/stats - Result and geocode cache statistics",
+            "GET /pipeline/stats - Worker pool queue depth and stage timings",
+            "GET /enrichment/{token} - Deferred location names",
+            "GET /enrichment/{token}/stream - Deferred location names (server-sent events)",
+            "GET /info - API information",
+            "GET /ready - Readiness and warm-up progress"
         ],
         documentation_url="/docs"
     )
@@ -76,6 +137,16 @@ async def get_info():
 @router.post("/recommend_sites", response_model=MLResponse)
 async def recommend_sites(
     request: PolygonRequest,
+    fields: Optional[str] = Query(
+        None,
+        description="Comma-separated site fields to return, e.g. lat,lon,predicted_score,site_id"
+    ),
+    enrichment: str = Query(
+        "inline",
+        pattern="^(inline|deferred)$",
+        description="deferred returns sites without waiting for reverse geocoding; "
+                    "location names are then served under /enrichment/{token}"
+    ),
     ml_service_instance: MLService = Depends(get_ml_service)
 ):
     """Main endpoint for site recommendations"""
@@ -83,103 +154,267 @@ async def recommend_sites(
     start_time = time.time()
     
     try:
-        # Ensure model and dataset are loaded
-        if not ml_service_instance.model_loaded:
-            ml_service_instance.load_model()
-            if not ml_service_instance.model_loaded:
-                ml_service_instance.train_model_if_needed()
+        site_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if warmup.running:
+        raise _warming_up()
+    
+    try:
+        # Ensure model and dataset are loaded. CPU-bound stages run on the pipeline
+        # pool so health checks and light endpoints stay responsive under load
+        if not (ml_service_instance.model_loaded and ml_service_instance.dataset_loaded):
+            await pipeline.run("load", _ensure_loaded, ml_service_instance)
         
-        if not ml_service_instance.dataset_loaded:
-            ml_service_instance.load_dataset()
-        
-        # Filter sites by polygon
-        filtered_sites = ml_service_instance.filter_sites_by_polygon(request.polygon_points)
-        
-        if filtered_sites.empty:
-            # No sites in polygon, return nearest sites
-            nearest_sites = ml_service_instance.get_nearest_sites(request.polygon_points)
-            
-            # Add location names to nearest sites
-            nearest_sites_with_locations = ml_service_instance.add_location_names_to_sites(nearest_sites)
-            
-            # Convert to response format
-            recommended_sites = [
-                SiteRecommendation(
-                    lat=site["lat"],
-                    lon=site["lon"],
-                    capacity=site.get("capacity"),
-                    distance_to_renewable=site.get("distance_to_renewable"),
-                    demand_index=site.get("demand_index"),
-                    water_availability=site.get("water_availability"),
-                    land_cost=site.get("land_cost"),
-                    predicted_score=site.get("site_score"),
-                    site_id=site.get("site_id"),
-                    city=site.get("city"),
-                    state=site.get("state"),
-                    district=site.get("district"),
-                    display_name=site.get("display_name")
-                ) for _, site in nearest_sites_with_locations.iterrows()
-            ]
-            
-            return MLResponse(
-                message="No candidate sites inside polygon. Returning nearest 5 sites.",
-                recommended_sites=recommended_sites,
-                total_sites_found=len(nearest_sites),
-                polygon_analysis=PolygonAnalysis(
-                    area_km2=ml_service_instance.calculate_polygon_area(request.polygon_points),
-                    point_count=len(request.polygon_points),
-                    status="no_sites_found"
-                ),
-                polygon_points_received=request.polygon_points,
-                processing_time_ms=(time.time() - start_time) * 1000,
-                model_version=settings.API_VERSION
+        # Pin the live snapshot so a concurrent model swap can't mix versions in this response
+        ml_service_instance = ml_service_instance.pinned()
+        
+        # Rankings are cached per canonical polygon and (model, dataset) version
+        cache_key = (
+            canonical_polygon(request.polygon_points, settings.RESULT_CACHE_COORD_DECIMALS),
+            settings.MAX_RECOMMENDATIONS,
+            ml_service_instance.model_signature,
+            ml_service_instance.dataset_signature
+        )
+        
+        async def rank_sites():
+            # Filter sites by polygon and select the top recommendations,
+            # falling back to the nearest sites when the polygon holds none
+            return await pipeline.run(
+                "rank", ml_service_instance.recommend_positions,
+                request.polygon_points, settings.MAX_RECOMMENDATIONS
+            )
+        
+        # Degraded rankings (no scores, errors) are returned but not cached
+        top_positions, total_sites_found, found_in_polygon, _ = await result_cache.get_or_compute(
+            cache_key, rank_sites, cacheable=lambda result: result[3]
+        )
+        
+        if found_in_polygon:
+            message = "Candidate sites found in polygon."
+            status = "sites_found"
+        else:
+            message = "No candidate sites inside polygon. Returning nearest 5 sites."
+            status = "no_sites_found"
+        
+        # Decode only the returned rows and requested fields straight from the column arrays
+        def decode_sites():
+            return (
+                ml_service_instance.site_records(top_positions, fields=site_fields, raw=True),
+                ml_service_instance.calculate_polygon_area(request.polygon_points)
             )
         
-        # Predict scores for filtered sites
-        scored_sites = ml_service_instance.predict_scores(filtered_sites)
-        
-        # Get top recommendations
-        top_sites = scored_sites.head(settings.MAX_RECOMMENDATIONS)
-        
-        # Add location names to sites
-        top_sites_with_locations = ml_service_instance.add_location_names_to_sites(top_sites)
-        
-        # Convert to response format
-        recommended_sites = [
-            SiteRecommendation(
-                lat=site["lat"],
-                lon=site["lon"],
-                capacity=site.get("capacity"),
-                distance_to_renewable=site.get("distance_to_renewable"),
-                demand_index=site.get("demand_index"),
-                water_availability=site.get("water_availability"),
-                land_cost=site.get("land_cost"),
-                predicted_score=site.get("predicted_score"),
-                site_id=site.get("site_id"),
-                city=site.get("city"),
-                state=site.get("state"),
-                district=site.get("district"),
-                display_name=site.get("display_name")
-            ) for _, site in top_sites_with_locations.iterrows()
-        ]
-        
-        # Calculate polygon area
-        area_km2 = ml_service_instance.calculate_polygon_area(request.polygon_points)
-        
-        return MLResponse(
-            message="Candidate sites found in polygon.",
-            recommended_sites=recommended_sites,
-            total_sites_found=len(filtered_sites),
-            polygon_analysis=PolygonAnalysis(
-                area_km2=area_km2,
-                point_count=len(request.polygon_points),
-                status="sites_found"
-            ),
-            polygon_points_received=request.polygon_points,
+        sites, area_km2 = await pipeline.run("decode", decode_sites)
+        
+        # Add location names to sites (skipped when the projection has no location fields)
+        enrichment_info = None
+        if wants_location(site_fields):
+            if enrichment == "deferred":
+                enrichment_info = await _start_enrichment(ml_service_instance, sites, top_positions, site_fields)
+            else:
+                sites = await ml_service_instance.add_location_names_to_sites(sites, top_positions)
+        
+        # Encode with orjson directly; the pydantic response model only documents the schema
+        return ORJSONResponse({
+            "message": message,
+            "recommended_sites": sites,
+            "total_sites_found": total_sites_found,
+            "polygon_analysis": {
+                "area_km2": area_km2,
+                "point_count": len(request.polygon_points),
+                "status": status,
+                "centroid": None
+            },
+            "polygon_points_received": request.polygon_points,
+            "processing_time_ms": (time.time() - start_time) * 1000,
+            "model_version": settings.API_VERSION,
+            "enrichment": enrichment_info
+        })
+        
+    except PipelineOverloaded:
+        raise _overloaded()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+async def _start_enrichment(service: MLService, sites, positions, site_fields: List[str]):
+    """
+    Fill stored locations now and resolve the rest in the background
+    Returns the enrichment info for the response, or None when nothing is left to resolve
+    """
+    pending = await pipeline.run("enrich", service.fill_stored_locations, sites, positions)
+    if not pending or not settings.ENABLE_REVERSE_GEOCODING:
+        return None
+    
+    location_fields = [field for field in site_fields if field in LOCATION_FIELDS]
+    sites = list(zip(pending, positions[pending].tolist()))
+    job = enrichment_store.start(
+        encode_token(_dataset_tag(service), location_fields, sites),
+        _pending_sites(service, sites),
+        location_fields,
+        service.geocoder.reverse_geocode_many
+    )
+    return {
+        "token": job.token,
+        "status": job.status,
+        "pending_sites": job.total,
+        "results_url": f"/api/v1/enrichment/{job.token}",
+        "stream_url": f"/api/v1/enrichment/{job.token}/stream"
+    }
+
+def _dataset_tag(service: MLService) -> str:
+    """Short id of the loaded dataset version, so tokens never name another dataset's rows"""
+    return hashlib.sha1(repr(service.dataset_signature).encode()).hexdigest()[:8]
+
+def _pending_sites(service: MLService, sites):
+    """(rank index, site_id, (lat, lon)) for (rank index, dataset position) pairs"""
+    positions = np.array([position for _, position in sites], dtype=np.intp)
+    site_ids = service.site_records(positions, fields=["site_id"])
+    coordinates = service.site_coordinates(positions)
+    return [(i, record["site_id"], coordinate) for (i, _), record, coordinate in zip(sites, site_ids, coordinates)]
+
+def _get_enrichment_job(token: str):
+    job = enrichment_store.get(token)
+    if job is not None:
+        return job
+    
+    # Started by another worker, or expired here: resolve the sites the token names.
+    # Labels the other worker already found come from the shared geocode cache
+    decoded = decode_token(token)
+    if decoded is None:
+        raise HTTPException(status_code=404, detail="Unknown enrichment token")
+    if warmup.running or not ml_service.dataset_loaded:
+        raise _warming_up()
+    
+    service = ml_service.pinned()
+    dataset_tag, fields, sites = decoded
+    if (len(sites) > settings.MAX_RECOMMENDATIONS or not set(fields) <= set(LOCATION_FIELDS)
+            or any(not 0 <= position < len(service.store) for _, position in sites)):
+        raise HTTPException(status_code=404, detail="Unknown enrichment token")
+    if dataset_tag != _dataset_tag(service):
+        raise HTTPException(
+            status_code=410,
+            detail="The dataset was reloaded since this token was issued; request the recommendation again"
+        )
+    
+    return enrichment_store.start(token, _pending_sites(service, sites), fields, service.geocoder.reverse_geocode_many)
+
+@router.get("/enrichment/{token}", response_model=EnrichmentResponse)
+async def get_enrichment(token: str):
+    """Location names resolved so far for a deferred recommendation response"""
+    return _get_enrichment_job(token).summary()
+
+@router.get("/enrichment/{token}/stream")
+async def stream_enrichment(token: str):
+    """Server-sent events: one location event per resolved site, then a complete event"""
+    job = _get_enrichment_job(token)
+    
+    async def events():
+        async for location in job.stream():
+            yield sse_event("location", location)
+        yield sse_event("complete", {
+            "token": job.token,
+            "total_sites": job.total,
+            "resolved_sites": len(job.locations)
+        })
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def _to_nearby_sites(service: MLService, positions, distances_km) -> List[NearbySite]:
+    """Convert queried site positions to response models"""
+    sites = service.site_records(positions, extra={"distance_km": distances_km})
+    return [NearbySite(**site) for site in sites]
+
+@router.post("/sites/radius", response_model=SiteQueryResponse)
+async def sites_within_radius(
+    request: RadiusQueryRequest,
+    ml_service_instance: MLService = Depends(get_ml_service)
+):
+    """All sites within a radius of a point, optionally filtered by attributes"""
+    
+    if warmup.running:
+        raise _warming_up()
+    
+    start_time = time.time()
+    
+    try:
+        if not ml_service_instance.dataset_loaded:
+            await pipeline.run("load", _ensure_loaded, ml_service_instance, need_model=False)
+        
+        ml_service_instance = ml_service_instance.pinned()
+        
+        positions, distances_km = await pipeline.run(
+            "query", ml_service_instance.get_sites_within_radius,
+            request.lat, request.lon, request.radius_km,
+            min_capacity=request.min_capacity,
+            max_land_cost=request.max_land_cost
+        )
+        
+        limit = settings.MAX_RADIUS_RESULTS
+        sites = await pipeline.run(
+            "decode", _to_nearby_sites, ml_service_instance, positions[:limit], distances_km[:limit]
+        )
+        return SiteQueryResponse(
+            message=f"Found {len(positions)} sites within {request.radius_km} km.",
+            sites=sites,
+            total_sites_found=len(positions),
+            query_point=[request.lat, request.lon],
             processing_time_ms=(time.time() - start_time) * 1000,
             model_version=settings.API_VERSION
         )
         
+    except PipelineOverloaded:
+        raise _overloaded()
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+@router.post("/sites/nearest", response_model=SiteQueryResponse)
+async def nearest_sites(
+    request: NearestQueryRequest,
+    ml_service_instance: MLService = Depends(get_ml_service)
+):
+    """k nearest sites to a point, optionally filtered by attributes"""
+    
+    if warmup.running:
+        raise _warming_up()
+    
+    start_time = time.time()
+    
+    try:
+        if not ml_service_instance.dataset_loaded:
+            await pipeline.run("load", _ensure_loaded, ml_service_instance, need_model=False)
+        
+        ml_service_instance = ml_service_instance.pinned()
+        
+        positions, distances_km = await pipeline.run(
+            "query", ml_service_instance.get_nearest_sites_matching,
+            request.lat, request.lon, request.k,
+            min_capacity=request.min_capacity,
+            max_land_cost=request.max_land_cost
+        )
+        
+        sites = await pipeline.run("decode", _to_nearby_sites, ml_service_instance, positions, distances_km)
+        return SiteQueryResponse(
+            message=f"Returning nearest {len(positions)} matching sites.",
+            sites=sites,
+            total_sites_found=len(positions),
+            query_point=[request.lat, request.lon],
+            processing_time_ms=(time.time() - start_time) * 1000,
+            model_version=settings.API_VERSION
+        )
+        
+    except PipelineOverloaded:
+        raise _overloaded()
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -198,22 +433,51 @@ async def get_model_info():
 
 @router.post("/model/reload")
 async def reload_model():
-    """Reload the ML model"""
+    """
+    Load the model file into a new snapshot in the background, warm and check it,
+    then swap it in atomically; requests keep using the live model meanwhile
+    """
+    if warmup.running:
+        raise _warming_up()
+    
     try:
-        success = ml_service.load_model()
-        if success:
-            return {"message": "Model reloaded successfully", "status": "success"}
-        else:
-            raise HTTPException(status_code=500, detail="Failed to reload model")
+        record = await asyncio.to_thread(model_registry.reload)
+    except ReloadInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ModelRejected as e:
+        raise HTTPException(status_code=422, detail=f"Model rejected, live model unchanged: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reloading model: {str(e)}")
+    
+    # Cached rankings belong to the previous model
+    result_cache.clear()
+    return {"message": "Model reloaded successfully", "status": "success", "reload": record}
+
+@router.get("/model/versions")
+async def get_model_versions():
+    """Live model version and recent reload attempts"""
+    return model_registry.status()
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Get polygon result and reverse-geocode cache counters"""
+    return {
+        "polygon_results": result_cache.stats(),
+        "geocode": geocode_cache.stats(),
+        "geocoder": geocoding_client.stats()
+    }
+
+@router.get("/pipeline/stats")
+async def get_pipeline_stats():
+    """Get worker pool queue depth and per-stage timings"""
+    return pipeline.stats()
 
 @router.get("/dataset/status")
 async def get_dataset_status():
     """Get dataset status"""
     return {
         "loaded": ml_service.dataset_loaded,
-        "total_sites": len(ml_service.dataset) if ml_service.dataset_loaded else 0,
+        "total_sites": len(ml_service.store) if ml_service.dataset_loaded else 0,
         "file": settings.DATASET_FILE
     }
 
@@ -223,9 +487,9 @@ async def get_dataset_sample(limit: int = 5):
     if not ml_service.dataset_loaded:
         raise HTTPException(status_code=400, detail="Dataset not loaded")
     
-    sample_data = ml_service.dataset.head(limit)
+    sample_data = ml_service.store.to_frame(slice(0, max(limit, 0)))
     return {
         "sample_data": sample_data.to_dict(orient="records"),
-        "total_sites": len(ml_service.dataset),
+        "total_sites": len(ml_service.store),
         "sample_size": len(sample_data)
     }
@@ -0,0 +1,49 @@
+"""
+Fast JSON serialization for site recommendation responses
+"""
+
+from typing import List, Optional
+
+# Fields of a recommended site, in response order (mirrors models.SiteRecommendation)
+SITE_FIELDS: List[str] = [
+    "lat",
+    "lon",
+    "capacity",
+    "distance_to_renewable",
+    "demand_index",
+    "water_availability",
+    "land_cost",
+    "predicted_score",
+    "score_percentile",
+    "site_id",
+    "city",
+    "state",
+    "district",
+    "display_name"
+]
+
+# Fields filled in by reverse geocoding
+LOCATION_FIELDS: List[str] = ["city", "state", "district", "display_name"]
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated fields projection (e.g. "lat,lon,predicted_score,site_id")
+    Returns all site fields when no projection is given
+    """
+    if not fields:
+        return list(SITE_FIELDS)
+
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in requested if name not in SITE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Allowed fields: {', '.join(SITE_FIELDS)}")
+    if not requested:
+        raise ValueError("fields must name at least one site field")
+
+    return requested
+
+
+def wants_location(fields: List[str]) -> bool:
+    """Whether a projection includes any reverse-geocoded field"""
+    return any(name in LOCATION_FIELDS for name in fields)
@@ -0,0 +1,230 @@
+"""
+Site arrays shared by every worker process through a memory-mapped segment
+
+A segment is a directory of .npy files plus a manifest, normally under /dev/shm.
+The first worker to need a (dataset, model) pair builds it under a file lock and
+publishes it with an atomic rename; every worker then maps the files read-only,
+so the page cache holds one copy of the site table however many workers run.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from .ranking import ScoreGridIndex
+from .site_store import NumberedLabels, SiteStore
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FORMAT = 2
+SEGMENT_PREFIX = "segment-"
+MANIFEST_FILE = "manifest.json"
+
+# In-progress (.tmp) and replaced (.old) directories carry their writer's pid
+_WORKING_DIR = re.compile(r"\.(?:tmp|old)(\d+)$")
+
+Built = Tuple[SiteStore, Optional[ScoreGridIndex]]
+
+
+def segment_key(*signatures) -> str:
+    """Stable segment name for the artifact versions it was built from"""
+    return hashlib.sha1(repr((SEGMENT_FORMAT,) + signatures).encode()).hexdigest()[:16]
+
+
+def write_segment(directory: str, store: SiteStore, grid: Optional[ScoreGridIndex],
+                  extra: Optional[Dict] = None) -> None:
+    """
+    Write a store and score grid as a segment directory (atomically)
+    extra is stored in the manifest; an existing directory is replaced
+    """
+    tmp_dir = f"{directory}.tmp{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    try:
+        _write_files(tmp_dir, store, grid, extra)
+    except BaseException:
+        # e.g. ENOSPC on a small /dev/shm: don't leave the partial copy behind
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Processes that mapped the old files keep reading them until they reload
+    old_dir = f"{directory}.old{os.getpid()}"
+    if os.path.isdir(directory):
+        os.rename(directory, old_dir)
+    try:
+        os.rename(tmp_dir, directory)
+    except OSError:
+        if os.path.isdir(old_dir):
+            os.rename(old_dir, directory)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _write_files(tmp_dir: str, store: SiteStore, grid: Optional[ScoreGridIndex], extra: Optional[Dict]) -> None:
+    os.makedirs(tmp_dir)
+    manifest = {"format": SEGMENT_FORMAT, "length": len(store), "columns": store.columns,
+                "numeric": [], "coded": {}, "grid": None, **(extra or {})}
+
+    for i, (name, values) in enumerate(store.numeric.items()):
+        np.save(os.path.join(tmp_dir, f"numeric_{i}.npy"), np.ascontiguousarray(values))
+        manifest["numeric"].append(name)
+
+    for i, (name, (codes, uniques)) in enumerate(store.coded.items()):
+        np.save(os.path.join(tmp_dir, f"codes_{i}.npy"), codes)
+        entry = {"index": i}
+        if isinstance(uniques, NumberedLabels):
+            entry["numbered"] = [uniques.prefix, uniques.width]
+        elif all(isinstance(value, str) for value in uniques):
+            # Fixed-width strings can be mapped like any other array
+            np.save(os.path.join(tmp_dir, f"uniques_{i}.npy"), np.asarray(uniques, dtype=str))
+        else:
+            entry["uniques"] = [value.item() if isinstance(value, np.generic) else value for value in uniques]
+        manifest["coded"][name] = entry
+
+    if grid is not None:
+        meta, arrays = grid.to_arrays()
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_dir, f"grid_{name}.npy"), np.ascontiguousarray(values))
+        manifest["grid"] = meta
+
+    # The manifest goes in last, so a directory without one is never attached
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+def read_manifest(directory: str) -> Dict:
+    """Manifest of a published segment"""
+    with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SEGMENT_FORMAT:
+        raise ValueError(f"unsupported segment format {manifest.get('format')}")
+    return manifest
+
+
+def attach_segment(directory: str) -> Built:
+    """Map a segment read-only; arrays are views of the shared files (no copies)"""
+    manifest = read_manifest(directory)
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(directory, name), mmap_mode="r")
+
+    numeric = {name: load(f"numeric_{i}.npy") for i, name in enumerate(manifest["numeric"])}
+    coded = {}
+    for name, entry in manifest["coded"].items():
+        i = entry["index"]
+        if "numbered" in entry:
+            uniques = NumberedLabels(*entry["numbered"])
+        elif "uniques" in entry:
+            uniques = np.asarray(entry["uniques"], dtype=object)
+        else:
+            uniques = load(f"uniques_{i}.npy")
+        coded[name] = (load(f"codes_{i}.npy"), uniques)
+    store = SiteStore(numeric, coded, list(manifest["columns"]))
+
+    grid = None
+    if manifest["grid"] is not None:
+        arrays = {name: load(f"grid_{name}.npy") for name in ScoreGridIndex.ARRAYS}
+        grid = ScoreGridIndex.from_arrays(manifest["grid"], arrays)
+
+    return store, grid
+
+
+def remove_stale_segments(root: str, keep: str) -> None:
+    """
+    Delete segments for artifact versions other than key keep
+    Workers still mapping them keep their pages until they move on; lock files
+    and other builders' in-progress .tmp directories are left alone
+    """
+    keep = SEGMENT_PREFIX + keep
+    try:
+        names = os.listdir(root)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(root, name)
+        if (name.startswith(SEGMENT_PREFIX) and name != keep and ".tmp" not in name
+                and ".old" not in name and os.path.isdir(path)):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def remove_segment(root: str, key: str) -> None:
+    """Delete the segment for key, e.g. one built for a model that was rejected"""
+    shutil.rmtree(os.path.join(root, SEGMENT_PREFIX + key), ignore_errors=True)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _remove_orphans(root: str) -> None:
+    """Delete .tmp/.old directories left by writers that died before cleaning up"""
+    for name in os.listdir(root):
+        match = _WORKING_DIR.search(name)
+        path = os.path.join(root, name)
+        if (name.startswith(SEGMENT_PREFIX) and match and int(match.group(1)) != os.getpid()
+                and not _pid_alive(int(match.group(1))) and os.path.isdir(path)):
+            logger.info(f"Removing orphaned segment directory {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_or_create_segment(root: str, key: str, build: Callable[[], Built],
+                           remove_stale: bool = True) -> Tuple[SiteStore, Optional[ScoreGridIndex], bool]:
+    """
+    Attach the segment for key, building it with build() if no worker has yet
+    Returns (store, grid, shared); without file locks (Windows) or a usable
+    root directory the built arrays are returned unshared
+    remove_stale=False keeps other versions' segments, for a build that may
+    still be rejected; the caller removes them once it is published
+    """
+    if fcntl is None:
+        store, grid = build()
+        return store, grid, False
+
+    name = SEGMENT_PREFIX + key
+    directory = os.path.join(root, name)
+    try:
+        os.makedirs(root, exist_ok=True)
+        lock_fd = os.open(directory + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+    except OSError as e:
+        logger.warning(f"Shared segment directory unavailable ({e}); keeping a private copy")
+        store, grid = build()
+        return store, grid, False
+
+    try:
+        # Other workers wait here while the first one builds the segment
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        if not os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            _remove_orphans(root)
+            store, grid = build()
+            try:
+                write_segment(directory, store, grid)
+                logger.info(f"✅ Shared dataset segment created: {directory}")
+                if remove_stale:
+                    remove_stale_segments(root, key)
+            except OSError as e:
+                logger.warning(f"Could not write shared segment ({e}); keeping a private copy")
+                return store, grid, False
+
+        store, grid = attach_segment(directory)
+        logger.info(f"✅ Attached shared dataset segment: {directory}")
+        return store, grid, True
+    finally:
+        fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        os.close(lock_fd)
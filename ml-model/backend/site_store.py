@@ -0,0 +1,210 @@
+"""
+Columnar site storage used on the request hot path
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .config import settings
+from .serialization import LOCATION_FIELDS
+
+Positions = Union[np.ndarray, slice, None]
+
+# Model features keep full precision: the booster's split thresholds sit on
+# training values, so rounding them to float32 moves sites across splits
+PRECISE_COLUMNS = set(settings.FEATURES)
+
+# Dtypes applied while parsing the site CSV, so values never pass through
+# unneeded float64 or per-row Python strings; columns not listed are inferred
+SITE_SCHEMA: Dict[str, Any] = {
+    **{name: np.float32 for name in ["lat", "lon", "site_score"]},
+    **{name: np.float64 for name in PRECISE_COLUMNS},
+    "site_id": str,
+    **{name: "category" for name in LOCATION_FIELDS}
+}
+
+# <prefix><digits>, e.g. site_0042
+_NUMBERED_LABEL = r"^(\D*?)(\d+)$"
+
+
+def _py_floats(values: np.ndarray) -> List[Optional[float]]:
+    """Convert a float32/float64 array to Python floats, mapping NaN to None"""
+    # str() of a float32 is its shortest round-trip repr, so 22.369247 stays 22.369247
+    # instead of widening to 22.369247436523438
+    return [None if value != value else float(str(value)) for value in values]
+
+
+def read_sites_csv(path: str) -> pd.DataFrame:
+    """Parse a site CSV with the compact schema"""
+    header = pd.read_csv(path, nrows=0).columns
+    return pd.read_csv(path, dtype={name: dtype for name, dtype in SITE_SCHEMA.items() if name in header})
+
+
+class NumberedLabels:
+    """
+    Lookup table for labels of the form <prefix><number> (site_0000, site_0001, ...)
+    The number itself is the int32 code, so no strings are kept per site
+    """
+
+    def __init__(self, prefix: str, width: int):
+        self.prefix = prefix
+        self.width = width
+
+    @classmethod
+    def parse(cls, labels: np.ndarray) -> Optional[Tuple["NumberedLabels", np.ndarray]]:
+        """(table, number of each label), or None if the labels don't share one pattern"""
+        if len(labels) == 0 or not all(isinstance(label, str) for label in labels):
+            return None
+        parts = pd.Series(labels, dtype=object).str.extract(_NUMBERED_LABEL)
+        if parts[1].isna().any() or parts[0].nunique() != 1:
+            return None
+
+        digits = parts[1]
+        lengths = digits.str.len()
+        if lengths.nunique() == 1:
+            width = int(lengths.iloc[0])
+        elif not (digits.str.startswith("0") & (lengths > 1)).any():
+            width = 0
+        else:
+            return None
+
+        numbers = digits.astype(np.int64).to_numpy()
+        if numbers.max() > np.iinfo(np.int32).max or len(np.unique(numbers)) != len(numbers):
+            return None
+        return cls(parts[0].iloc[0], width), numbers.astype(np.int32)
+
+    def format(self, numbers: np.ndarray) -> np.ndarray:
+        return np.array([f"{self.prefix}{number:0{self.width}d}" for number in numbers.tolist()], dtype=object)
+
+
+class SiteStore:
+    """
+    Compact columnar copy of the site table
+    - Numeric columns are contiguous float32 arrays (float64 for model features)
+    - Text columns are int32 codes into a lookup table; patterned ids
+      (site_0042) store just the number
+    Requests filter and rank on positional index arrays and only decode the rows
+    they return; pandas frames are built on demand for admin and sample endpoints
+    """
+
+    def __init__(self, numeric: Dict[str, np.ndarray],
+                 coded: Dict[str, Tuple[np.ndarray, np.ndarray]], columns: List[str]):
+        self.numeric = numeric
+        self.coded = coded
+        self.columns = columns
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SiteStore":
+        """Build a store from a pandas dataframe"""
+        numeric, coded = {}, {}
+        for name in df.columns:
+            column = df[name]
+            if pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_bool_dtype(column):
+                dtype = np.float64 if name in PRECISE_COLUMNS else np.float32
+                numeric[name] = np.ascontiguousarray(column.to_numpy(dtype=dtype, na_value=np.nan))
+            else:
+                # Missing values get code -1
+                codes, uniques = pd.factorize(column)
+                uniques = np.asarray(uniques, dtype=object)
+                numbered = NumberedLabels.parse(uniques)
+                if numbered is not None:
+                    labels, numbers = numbered
+                    coded[name] = (np.where(codes >= 0, numbers[codes], -1).astype(np.int32), labels)
+                else:
+                    coded[name] = (codes.astype(np.int32), uniques)
+        return cls(numeric, coded, list(df.columns))
+
+    def copy(self) -> "SiteStore":
+        """Store sharing the column arrays, whose set of columns can change independently"""
+        return SiteStore(dict(self.numeric), dict(self.coded), list(self.columns))
+
+    def __len__(self) -> int:
+        if self.numeric:
+            return len(next(iter(self.numeric.values())))
+        if self.coded:
+            return len(next(iter(self.coded.values()))[0])
+        return 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.numeric or name in self.coded
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate resident size of the stored columns"""
+        total = sum(values.nbytes for values in self.numeric.values())
+        for codes, uniques in self.coded.values():
+            total += codes.nbytes
+            if not isinstance(uniques, NumberedLabels):
+                total += uniques.nbytes + sum(len(str(value)) for value in uniques)
+        return total
+
+    def column(self, name: str) -> np.ndarray:
+        """Numeric column as a float array (no copy)"""
+        return self.numeric[name]
+
+    def set_column(self, name: str, values: np.ndarray) -> None:
+        """Add or replace a numeric column"""
+        self.numeric[name] = np.ascontiguousarray(values, dtype=np.float32)
+        if name not in self.columns:
+            self.columns.append(name)
+
+    def feature_matrix(self, features: List[str]) -> np.ndarray:
+        """Float64 feature matrix with missing features and values filled with 0"""
+        matrix = np.zeros((len(self), len(features)), dtype=np.float64)
+        for i, name in enumerate(features):
+            if name in self.numeric:
+                matrix[:, i] = np.nan_to_num(self.numeric[name], nan=0.0)
+        return matrix
+
+    def decode(self, name: str, positions: Positions = None) -> np.ndarray:
+        """Decode a text column for the given rows (None for missing values)"""
+        codes, uniques = self.coded[name]
+        codes = codes if positions is None else codes[positions]
+        if isinstance(uniques, NumberedLabels):
+            values = uniques.format(codes)
+        elif len(uniques):
+            # Shared segments keep text lookup tables as fixed-width strings
+            values = uniques[np.maximum(codes, 0)].astype(object, copy=False)
+        else:
+            values = np.full(len(codes), None, dtype=object)
+        values[codes < 0] = None
+        return values
+
+    def to_frame(self, positions: Positions = None) -> pd.DataFrame:
+        """Materialize the given rows (default: all) as a pandas dataframe"""
+        data = {}
+        for name in self.columns:
+            if name in self.numeric:
+                values = self.numeric[name]
+                data[name] = values if positions is None else values[positions]
+            else:
+                data[name] = self.decode(name, positions)
+        return pd.DataFrame(data)
+
+    def records(self, positions: np.ndarray, fields: Optional[List[str]] = None,
+                extra: Optional[Dict[str, np.ndarray]] = None, raw: bool = False) -> List[Dict[str, Any]]:
+        """
+        Rows as dicts, in the order of positions
+        - fields selects and orders the columns; fields the store lacks come back as None
+        - extra adds per-row columns (e.g. distance_km) aligned with positions
+        - raw keeps numeric values as numpy float32 scalars for encoders that
+          serialize them natively, instead of converting them to Python floats
+        """
+        fields = fields or self.columns
+        columns = {}
+        for name in fields:
+            if name in self.numeric:
+                values = self.numeric[name][positions]
+                columns[name] = values if raw else _py_floats(values)
+            elif name in self.coded:
+                columns[name] = self.decode(name, positions).tolist()
+            else:
+                columns[name] = [None] * len(positions)
+        for name, values in (extra or {}).items():
+            values = np.asarray(values, dtype=np.float32)
+            columns[name] = values if raw else _py_floats(values)
+
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
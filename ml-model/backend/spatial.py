@@ -0,0 +1,142 @@
+"""
+Spatial helpers for filtering hydrogen sites by geographic polygons
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+import shapely
+from shapely import STRtree
+from shapely.geometry import Polygon
+from sklearn.neighbors import BallTree
+
+# Mean Earth radius used to convert haversine distances to kilometres
+EARTH_RADIUS_KM = 6371.0088
+
+
+def build_polygon(polygon_points: List[List[float]]) -> Polygon:
+    """Build a prepared shapely polygon from [lat, lon] points"""
+    # Shapely uses lon, lat order
+    polygon = Polygon([(lon, lat) for lat, lon in polygon_points])
+
+    # Preparing caches the polygon's edge index so repeated containment
+    # tests don't rebuild it
+    shapely.prepare(polygon)
+    return polygon
+
+
+def points_in_polygon(polygon: Polygon, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """
+    Vectorized containment test for site coordinates
+    Returns a boolean mask aligned with the lat/lon arrays
+    """
+    lon_min, lat_min, lon_max, lat_max = polygon.bounds
+
+    # Bounding-box prefilter: points on or outside the box can't be strictly inside
+    mask = (lats > lat_min) & (lats < lat_max) & (lons > lon_min) & (lons < lon_max)
+
+    candidates = np.flatnonzero(mask)
+    if len(candidates):
+        # Exact test only for points that survived the prefilter
+        mask[candidates] = shapely.contains_xy(polygon, lons[candidates], lats[candidates])
+
+    return mask
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    lon2 = np.radians(np.asarray(lons, dtype=np.float64))
+
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class SiteIndex:
+    """
+    Spatial indexes over site points, built once per dataset load
+    - STR-tree over the points for polygon queries
+    - Ball tree on radians for haversine nearest-neighbour queries
+    """
+
+    def __init__(self, lats: np.ndarray, lons: np.ndarray):
+        # Keep references to the store's columns rather than widened copies
+        self.lats = np.asarray(lats)
+        self.lons = np.asarray(lons)
+        self.tree = STRtree(shapely.points(self.lons, self.lats))
+
+        # Ball tree can't hold missing coordinates, so map its rows back to site positions
+        self.has_coordinates = np.isfinite(self.lats) & np.isfinite(self.lons)
+        self.ball_positions = np.flatnonzero(self.has_coordinates)
+        self.ball_tree = BallTree(
+            np.radians(np.column_stack([self.lats[self.ball_positions], self.lons[self.ball_positions]]).astype(np.float64)),
+            metric="haversine"
+        )
+
+    def __len__(self) -> int:
+        return len(self.lats)
+
+    def query_polygon(self, polygon: Polygon) -> np.ndarray:
+        """
+        Positional indices of sites strictly inside the polygon
+        The tree yields bounding-box candidates; only those are tested exactly
+        """
+        candidates = np.sort(self.tree.query(polygon))
+        if not len(candidates):
+            return candidates
+
+        inside = shapely.contains_xy(polygon, self.lons[candidates], self.lats[candidates])
+        return candidates[inside]
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Haversine k-nearest-neighbour query
+        Returns (positional indices, distances in km), nearest first
+        """
+        k = min(k, len(self.ball_positions))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        distances, rows = self.ball_tree.query(np.radians([[lat, lon]]), k=k)
+        return self.ball_positions[rows[0]], distances[0] * EARTH_RADIUS_KM
+
+    def within_radius(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Haversine radius query
+        Returns (positional indices, distances in km), nearest first
+        """
+        rows, distances = self.ball_tree.query_radius(
+            np.radians([[lat, lon]]),
+            r=radius_km / EARTH_RADIUS_KM,
+            return_distance=True,
+            sort_results=True
+        )
+        return self.ball_positions[rows[0]], distances[0] * EARTH_RADIUS_KM
+
+    def nearest_matching(self, lat: float, lon: float, k: int, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest sites among those selected by a boolean predicate mask
+        Returns (positional indices, distances in km), nearest first
+        """
+        matching = np.flatnonzero(mask & self.has_coordinates)
+        k = min(k, len(matching))
+        if k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0)
+
+        # Selective predicates: measuring the few matching sites directly is cheaper
+        # than walking the tree past all the sites that fail the predicate
+        if len(matching) * 8 <= len(self.ball_positions):
+            distances = haversine_km(lat, lon, self.lats[matching], self.lons[matching])
+            order = np.argsort(distances)[:k]
+            return matching[order], distances[order]
+
+        # Otherwise widen the tree query until enough neighbours pass the predicate
+        k_query = k
+        while True:
+            k_query = min(k_query * 4, len(self.ball_positions))
+            distances, rows = self.ball_tree.query(np.radians([[lat, lon]]), k=k_query)
+            positions = self.ball_positions[rows[0]]
+            keep = mask[positions]
+            if keep.sum() >= k or k_query == len(self.ball_positions):
+                return positions[keep][:k], distances[0][keep][:k] * EARTH_RADIUS_KM
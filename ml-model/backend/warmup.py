@@ -0,0 +1,126 @@
+"""
+Background warm-up of the model and dataset at startup
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .ml_service import MLService, ml_service
+
+logger = logging.getLogger(__name__)
+
+
+class Warmup:
+    """
+    Loads, indexes and warms the service artifacts on a background thread, so
+    the server binds its port immediately instead of after the model (or a
+    training run) and the dataset are ready
+    Progress is reported by /ready; heavy endpoints answer 503 while it runs
+    """
+
+    STEPS = ["model", "dataset", "warm"]
+
+    def __init__(self, service: MLService):
+        self.service = service
+        self.state = "idle"  # idle, running, ready, failed
+        self.current_step: Optional[str] = None
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.steps = {name: {"status": "pending", "seconds": None} for name in self.STEPS}
+        self.current_step = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def ready(self) -> bool:
+        """Artifacts loaded and no warm-up in progress (requests may also load them lazily)"""
+        return not self.running and self.service.model_loaded and self.service.dataset_loaded
+
+    def start(self, background: bool = True) -> bool:
+        """Start warming up; returns False if a warm-up is already running"""
+        with self._lock:
+            if self.running:
+                return False
+            self._reset()
+            self.state = "running"
+
+        if background:
+            threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        else:
+            self._run()
+        return True
+
+    def _run(self) -> None:
+        steps: List[Tuple[str, Callable[[], None]]] = [
+            ("model", self._load_model),
+            ("dataset", self._load_dataset),
+            ("warm", self._warm)
+        ]
+        try:
+            for name, step in steps:
+                self.current_step = name
+                self.steps[name]["status"] = "running"
+                step_start = time.time()
+                step()
+                self.steps[name].update(status="done", seconds=round(time.time() - step_start, 3))
+            self.state = "ready"
+            logger.info(f"🎉 Warm-up complete in {time.time() - self.started_at:.1f}s")
+
+        except Exception as e:
+            self.steps[self.current_step]["status"] = "failed"
+            self.error = f"{self.current_step}: {e}"
+            self.state = "failed"
+            logger.error(f"❌ Warm-up failed at {self.current_step}: {e}")
+            logger.warning("Requests will try to load the missing artifacts on demand")
+
+        finally:
+            self.current_step = None
+            self.finished_at = time.time()
+
+    def _load_model(self) -> None:
+        # Load or train the model first, so the dataset can attach straight to
+        # the scored arrays shared by all workers instead of parsing the CSV
+        if not self.service.load_model() and not self.service.train_model_if_needed():
+            raise RuntimeError("model could not be loaded or trained")
+        logger.info("✅ Model ready")
+
+    def _load_dataset(self) -> None:
+        if not self.service.load_dataset():
+            raise RuntimeError("dataset could not be loaded")
+        logger.info("✅ Dataset loaded")
+
+    def _warm(self) -> None:
+        self.service.warm_up()
+        # Loads the gazetteer when it is the selected backend
+        self.service.geocoder
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness and per-step progress"""
+        done = sum(step["status"] == "done" for step in self.steps.values())
+        end = self.finished_at or time.time()
+        return {
+            "ready": self.ready,
+            "state": self.state,
+            "current_step": self.current_step,
+            "progress": round(done / len(self.STEPS), 3),
+            "steps": {name: dict(step) for name, step in self.steps.items()},
+            "elapsed_seconds": round(end - self.started_at, 3),
+            "error": self.error
+        }
+
+
+# Global warm-up tracker
+warmup = Warmup(ml_service)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Convert the site dataset CSV to the columnar binary copy the backend maps at startup
+
+Run after train_model.py or geocode_dataset.py change the CSV:
+    python convert_dataset.py
+The backend keeps reading the CSV while the columnar copy is missing or older than it.
+With --check, rankings from the compact float32 schema are first compared with a
+full float64 parse of the CSV, and nothing is written if any ranking changes.
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from backend.columnar import columnar_path, convert_dataset, load_columnar
+from backend.config import settings
+from backend.site_store import SiteStore, read_sites_csv
+from backend.spatial import build_polygon, haversine_km, points_in_polygon
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def ranked(scores, mask, k):
+    """Positions of the top-k scores inside mask, ties broken by position"""
+    positions = np.flatnonzero(mask)
+    order = np.lexsort((positions, -scores[positions].astype(np.float64)))
+    return positions[order[:k]]
+
+
+def check_precision(dataset_path, model_path, polygons=200, k=10, seed=42):
+    """
+    Compare the compact schema with a float64 parse of the CSV
+    Returns True when the top-k sites of every random polygon are identical
+    """
+    reference = pd.read_csv(dataset_path)
+    compact = SiteStore.from_frame(read_sites_csv(dataset_path))
+    model = joblib.load(model_path)
+
+    reference_scores = model.predict(reference.reindex(columns=settings.FEATURES).fillna(0))
+    compact_scores = model.predict(pd.DataFrame(compact.feature_matrix(settings.FEATURES), columns=settings.FEATURES))
+
+    ref_lats, ref_lons = reference["lat"].to_numpy(), reference["lon"].to_numpy()
+    lats, lons = compact.column("lat"), compact.column("lon")
+    drift_m = max(
+        haversine_km(lat, lon, np.array([clat], dtype=np.float64), np.array([clon], dtype=np.float64))[0]
+        for lat, lon, clat, clon in zip(ref_lats[:1000], ref_lons[:1000], lats[:1000], lons[:1000])
+    ) * 1000
+    print(f"Memory: {reference.memory_usage(deep=True).sum() / 1e6:.1f} MB as parsed, "
+          f"{compact.nbytes / 1e6:.1f} MB compact")
+    print(f"Max coordinate drift: {drift_m:.2f} m, max score drift: "
+          f"{np.abs(reference_scores - compact_scores).max():.2e}")
+
+    rng = np.random.default_rng(seed)
+    changed = 0
+    for _ in range(polygons):
+        lat, lon = rng.uniform(ref_lats.min(), ref_lats.max()), rng.uniform(ref_lons.min(), ref_lons.max())
+        half = rng.uniform(0.25, 3.0)
+        polygon = build_polygon([[lat - half, lon - half], [lat - half, lon + half],
+                                 [lat + half, lon + half], [lat + half, lon - half]])
+        expected = ranked(reference_scores, points_in_polygon(polygon, ref_lats, ref_lons), k)
+        actual = ranked(compact_scores, points_in_polygon(polygon, lats, lons), k)
+        changed += not np.array_equal(expected, actual)
+
+    print(f"Rankings changed in {changed} of {polygons} polygons (top {k})")
+    return changed == 0
+
+
+def main():
+    """Main conversion function"""
+    parser = argparse.ArgumentParser(description="Write the site dataset as memory-mappable .npy columns")
+    parser.add_argument("--dataset", default=os.path.join(BASE_DIR, settings.DATASET_FILE),
+                        help="dataset CSV to convert")
+    parser.add_argument("--output", default=None,
+                        help="output directory (default: <dataset>.columns next to the CSV)")
+    parser.add_argument("--check", action="store_true",
+                        help="verify that the compact schema keeps polygon rankings unchanged first")
+    parser.add_argument("--model", default=os.path.join(BASE_DIR, settings.MODEL_FILE),
+                        help="model used by --check")
+    args = parser.parse_args()
+
+    output = args.output or columnar_path(args.dataset)
+
+    print("📦 Hydrogen Site Recommender - Columnar Dataset")
+    print("=" * 60)
+
+    if not os.path.exists(args.dataset):
+        print(f"❌ Dataset not found: {args.dataset}")
+        return 1
+
+    if args.check and not check_precision(args.dataset, args.model):
+        print("❌ Compact schema changes rankings; columnar copy not written")
+        return 1
+
+    start_time = time.time()
+    store = convert_dataset(args.dataset, output)
+    print(f"✅ {len(store)} sites, {len(store.columns)} columns written to: {output} "
+          f"({time.time() - start_time:.1f}s)")
+
+    if args.output is None:
+        start_time = time.time()
+        mapped = load_columnar(args.dataset)
+        if mapped is None or len(mapped) != len(store):
+            print("❌ Columnar copy could not be mapped back")
+            return 1
+        print(f"✅ Mapped back in {(time.time() - start_time) * 1000:.1f}ms")
+
+    print(f"\nRestart or reload the backend to load the columnar copy.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
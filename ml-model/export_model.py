@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Export the pickled sklearn Pipeline to a native XGBoost booster the backend loads directly
+
+Run after train_model.py:
+    python export_model.py
+The StandardScaler is folded into the booster's attributes and the booster is
+saved as UBJSON next to the .pkl. Predictions over the dataset are compared
+with the Pipeline first, and nothing is written unless they are identical.
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from backend.booster import BoosterModel, booster_path
+from backend.columnar import file_sha256
+from backend.config import settings
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def median_ms(fn, repeat=200):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start_time) * 1000)
+    return float(np.median(timings))
+
+
+def main():
+    """Main export function"""
+    parser = argparse.ArgumentParser(description="Save the model as a native XGBoost UBJSON booster")
+    parser.add_argument("--model", default=os.path.join(BASE_DIR, settings.MODEL_FILE),
+                        help="pickled sklearn Pipeline(StandardScaler, XGBRegressor)")
+    parser.add_argument("--output", default=None,
+                        help="booster file (default: <model>.ubj next to the .pkl)")
+    parser.add_argument("--dataset", default=os.path.join(BASE_DIR, settings.DATASET_FILE),
+                        help="sites used to check that predictions are unchanged")
+    args = parser.parse_args()
+
+    output = args.output or booster_path(args.model)
+
+    print("🌲 Hydrogen Site Recommender - Native Booster Export")
+    print("=" * 60)
+
+    if not os.path.exists(args.model):
+        print(f"❌ Model not found: {args.model}")
+        return 1
+
+    start_time = time.time()
+    pipeline = joblib.load(args.model)
+    pickle_load_ms = (time.time() - start_time) * 1000
+    model = BoosterModel.from_pipeline(pipeline)
+
+    df = pd.read_csv(args.dataset).reindex(columns=model.features).fillna(0)
+    expected = pipeline.predict(df)
+    actual = model.predict(df.to_numpy(dtype=np.float64))
+    if not np.array_equal(expected, actual):
+        print(f"❌ Booster predictions differ from the Pipeline on "
+              f"{int((expected != actual).sum())} of {len(df)} sites; booster not written")
+        return 1
+    print(f"✅ Predictions identical to the Pipeline on all {len(df)} sites")
+
+    model.save(output, source={"sha256": file_sha256(args.model)})
+    print(f"✅ Booster written to: {output} ({os.path.getsize(output) / 1e3:.0f} KB, "
+          f"pickle {os.path.getsize(args.model) / 1e3:.0f} KB)")
+
+    start_time = time.time()
+    loaded = BoosterModel(xgb.Booster(model_file=output))
+    booster_load_ms = (time.time() - start_time) * 1000
+
+    row = df.iloc[[0]]
+    row_matrix = df.to_numpy(dtype=np.float64)[:1]
+    print(f"\nLoad:                 pickle {pickle_load_ms:.1f}ms, booster {booster_load_ms:.1f}ms")
+    print(f"Single-site predict:  pipeline {median_ms(lambda: pipeline.predict(row)):.3f}ms, "
+          f"booster {median_ms(lambda: loaded.predict(row_matrix)):.3f}ms")
+
+    print(f"\nRestart or reload the backend to load the booster.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
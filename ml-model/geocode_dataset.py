@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Resolve location names for every site once, offline, and store them in the dataset
+
+Run after train_model.py (which rewrites the dataset without these columns):
+    python geocode_dataset.py
+The job shares the backend's rate limit to respect Nominatim's terms and
+checkpoints every resolved site, so an interrupted run picks up where it stopped.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import pandas as pd
+import requests
+
+from backend.columnar import columnar_path, convert_dataset
+from backend.config import settings
+from backend.geocode_cache import geocode_cache
+from backend.geocoding import (
+    NOMINATIM_HEADERS, NOMINATIM_REVERSE_URL, fallback_location, location_from_response,
+    nominatim_params
+)
+from backend.rate_limiter import create_rate_limiter
+from backend.serialization import LOCATION_FIELDS
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_checkpoint(path):
+    """Locations already resolved by earlier runs, keyed by site_id"""
+    resolved = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A run killed mid-write leaves a partial last line
+                    continue
+                resolved[entry["site_id"]] = entry["location"]
+    return resolved
+
+
+def is_resolved(row):
+    """Whether the dataset row already carries a location"""
+    return "display_name" in row and isinstance(row["display_name"], str) and row["display_name"] != ""
+
+
+class Resolver:
+    """
+    Reverse geocoder that reuses the service's geocode cache and shares its
+    rate limit with any backend workers running on the same host
+    """
+
+    def __init__(self, rate_limit):
+        self.limiter = create_rate_limiter(
+            rate_limit, settings.GEOCODING_RATE_LIMIT_FILE, settings.GEOCODING_MAX_QUEUE_SECONDS
+        )
+        self.session = requests.Session()
+        self.session.headers.update(NOMINATIM_HEADERS)
+        self.requests_made = 0
+
+    def resolve(self, lat, lon):
+        """Location for a coordinate, or None if the lookup failed and should be retried later"""
+        found, location = geocode_cache.lookup(lat, lon)
+        if found:
+            return location or fallback_location(lat, lon)
+
+        self.limiter.acquire_blocking()
+        self.requests_made += 1
+
+        try:
+            response = self.session.get(
+                NOMINATIM_REVERSE_URL,
+                params=nominatim_params(lat, lon),
+                timeout=settings.GEOCODING_TIMEOUT
+            )
+            response.raise_for_status()
+            location = location_from_response(response.json())
+        except Exception as e:
+            print(f"⚠️  Lookup failed for {lat:.4f}, {lon:.4f}: {e}")
+            return None
+
+        geocode_cache.store(lat, lon, location)
+        return location or fallback_location(lat, lon)
+
+
+def write_dataset(df, resolved, dataset_path):
+    """Merge resolved locations into the dataset and replace the file atomically"""
+    for field in LOCATION_FIELDS:
+        stored = df[field] if field in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+        looked_up = df["site_id"].map(lambda site_id: resolved.get(site_id, {}).get(field))
+        df[field] = looked_up.where(looked_up.notna(), stored)
+
+    tmp_path = dataset_path + ".tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, dataset_path)
+
+    # Keep an existing columnar copy in step with the new CSV
+    if os.path.isdir(columnar_path(dataset_path)):
+        convert_dataset(dataset_path)
+
+
+def main():
+    """Main geocoding function"""
+    parser = argparse.ArgumentParser(description="Store location names for every site in the dataset")
+    parser.add_argument("--dataset", default=os.path.join(BASE_DIR, settings.DATASET_FILE),
+                        help="dataset CSV to update in place")
+    parser.add_argument("--checkpoint", default=None,
+                        help="progress file (default: <dataset>.geocode_checkpoint.jsonl)")
+    parser.add_argument("--rate-limit", type=float, default=settings.GEOCODING_RATE_LIMIT,
+                        help="seconds between Nominatim requests")
+    parser.add_argument("--limit", type=int, default=None,
+                        help="resolve at most this many sites in this run")
+    parser.add_argument("--force", action="store_true",
+                        help="re-resolve sites that already have a location")
+    args = parser.parse_args()
+
+    checkpoint_path = args.checkpoint or args.dataset + ".geocode_checkpoint.jsonl"
+
+    print("🗺️  Hydrogen Site Recommender - Offline Geocoding")
+    print("=" * 60)
+
+    df = pd.read_csv(args.dataset)
+    if "site_id" not in df.columns:
+        print("❌ Dataset has no site_id column; cannot checkpoint progress")
+        return 1
+
+    resolved = {} if args.force else load_checkpoint(checkpoint_path)
+    if args.force and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    pending = [
+        row for row in df[["site_id", "lat", "lon"] + [f for f in ["display_name"] if f in df.columns]].to_dict("records")
+        if row["site_id"] not in resolved and (args.force or not is_resolved(row))
+    ]
+    if args.limit is not None:
+        pending = pending[:args.limit]
+
+    print(f"Sites in dataset: {len(df)}")
+    print(f"Already resolved: {len(df) - len(pending)}")
+    print(f"To resolve now:   {len(pending)}")
+
+    resolver = Resolver(args.rate_limit)
+    failed = 0
+    interrupted = False
+    start_time = time.time()
+
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            for i, row in enumerate(pending, 1):
+                location = resolver.resolve(row["lat"], row["lon"])
+                if location is None:
+                    failed += 1
+                    continue
+
+                location = {field: location[field] for field in LOCATION_FIELDS}
+                resolved[row["site_id"]] = location
+                checkpoint.write(json.dumps({"site_id": row["site_id"], "location": location}) + "\n")
+                checkpoint.flush()
+
+                if i % 50 == 0 or i == len(pending):
+                    print(f"  {i}/{len(pending)} sites ({resolver.requests_made} Nominatim requests, "
+                          f"{time.time() - start_time:.0f}s)")
+    except KeyboardInterrupt:
+        interrupted = True
+        print("\n⏸️  Interrupted; progress is checkpointed, run again to resume")
+    finally:
+        write_dataset(df, resolved, args.dataset)
+        print(f"✅ Location columns written to: {args.dataset}")
+
+    if interrupted:
+        return 130
+
+    if failed:
+        print(f"⚠️  {failed} lookups failed; run again to retry them")
+        return 1
+
+    print(f"\n🎉 Geocoding completed successfully!")
+    print(f"Restart or reload the backend to serve the stored locations.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -90,6 +90,7 @@ class EnhancedBackendTester:
         tests = [
             ("GET", "/", 200, None, "Root endpoint"),
             ("GET", "/health", 200, None, "Health check"),
+            ("GET", "/ready", 200, None, "Readiness check"),
             ("GET", "/info", 200, None, "API information"),
             ("GET", "/docs", 200, None, "API documentation"),
         ]
@@ -109,11 +110,14 @@ class EnhancedBackendTester:
         tests = [
             ("GET", "/api/v1/", 200, None, "API v1 root"),
             ("GET", "/api/v1/health", 200, None, "API v1 health check"),
+            ("GET", "/api/v1/ready", 200, None, "API v1 readiness check"),
             ("GET", "/api/v1/info", 200, None, "API v1 info"),
             ("GET", "/api/v1/model/status", 200, None, "Model status"),
             ("GET", "/api/v1/model/info", 200, None, "Model info"),
             ("GET", "/api/v1/dataset/status", 200, None, "Dataset status"),
             ("GET", "/api/v1/dataset/sample", 200, None, "Dataset sample"),
+            ("GET", "/api/v1/cache/stats", 200, None, "Cache stats"),
+            ("GET", "/api/v1/pipeline/stats", 200, None, "Pipeline stats"),
         ]
         
         all_passed = True
@@ -172,6 +176,95 @@ class EnhancedBackendTester:
         
         return success1 and success2 and success3
     
+    def test_deferred_enrichment(self) -> bool:
+        """Test deferred location enrichment"""
+        print("\n🏷️  Testing Deferred Enrichment")
+        print("=" * 50)
+        
+        polygon = {
+            "polygon_points": [
+                [22.4707, 70.0577],
+                [22.4707, 70.0677],
+                [22.4807, 70.0677],
+                [22.4807, 70.0577]
+            ]
+        }
+        
+        # Test 1: Rankings come back without waiting for location names
+        success1 = self.test_endpoint(
+            "POST", "/api/v1/recommend_sites?enrichment=deferred", 200,
+            polygon, "Recommendations with deferred enrichment"
+        )
+        
+        # Test 2: Follow-up endpoint for the enrichment token (none when nothing is pending)
+        success2 = True
+        try:
+            result = requests.post(
+                f"{self.base_url}/api/v1/recommend_sites?enrichment=deferred", json=polygon
+            ).json()
+            if result.get("enrichment"):
+                success2 = self.test_endpoint(
+                    "GET", result["enrichment"]["results_url"], 200,
+                    None, "Deferred location names"
+                )
+        except Exception as e:
+            print(f"❌ Deferred location names: Error - {e}")
+            success2 = False
+        
+        # Test 3: Unknown token
+        success3 = self.test_endpoint(
+            "GET", "/api/v1/enrichment/unknown-token", 404,
+            None, "Unknown enrichment token (should fail)"
+        )
+        
+        return success1 and success2 and success3
+    
+    def test_point_queries(self) -> bool:
+        """Test radius and nearest-site query endpoints"""
+        print("\n🔍 Testing Point Queries")
+        print("=" * 50)
+        
+        # Test 1: Sites within a radius, with an attribute filter
+        radius_query = {
+            "lat": 22.4707,
+            "lon": 70.0577,
+            "radius_km": 200,
+            "min_capacity": 80
+        }
+        
+        success1 = self.test_endpoint(
+            "POST", "/api/v1/sites/radius", 200,
+            radius_query, "Sites within radius"
+        )
+        
+        # Test 2: k nearest sites with attribute filters
+        nearest_query = {
+            "lat": 22.4707,
+            "lon": 70.0577,
+            "k": 5,
+            "min_capacity": 80,
+            "max_land_cost": 50
+        }
+        
+        success2 = self.test_endpoint(
+            "POST", "/api/v1/sites/nearest", 200,
+            nearest_query, "Nearest matching sites"
+        )
+        
+        # Test 3: Invalid radius
+        invalid_radius = {
+            "lat": 22.4707,
+            "lon": 70.0577,
+            "radius_km": -5
+        }
+        
+        success3 = self.test_endpoint(
+            "POST", "/api/v1/sites/radius", 422,
+            invalid_radius, "Invalid radius (should fail validation)"
+        )
+        
+        return success1 and success2 and success3
+    
     def test_model_management(self) -> bool:
         """Test model management endpoints"""
         print("\n🔍 Testing Model Management")
@@ -183,6 +276,12 @@ class EnhancedBackendTester:
             None, "Model reload"
         )
         
+        # The reload is recorded as the live version
+        success = self.test_endpoint(
+            "GET", "/api/v1/model/versions", 200,
+            None, "Model versions"
+        ) and success
+        
         return success
     
     def test_performance_metrics(self) -> bool:
@@ -240,6 +339,15 @@ class EnhancedBackendTester:
                 print("❌ Server is not responding properly")
                 return False
             print("✅ Server is running and responding")
+            
+            # The model and dataset load in the background after the port opens
+            deadline = time.time() + 300
+            while requests.get(f"{self.base_url}/ready").status_code == 503:
+                if time.time() > deadline:
+                    print("❌ Server did not become ready within 300s")
+                    return False
+                time.sleep(2)
+            print("✅ Server is ready")
         except requests.exceptions.ConnectionError:
             print("❌ Cannot connect to server. Is it running?")
             print("Start the server using: python start_enhanced_backend.py")
@@ -250,6 +358,8 @@ class EnhancedBackendTester:
             ("Basic Endpoints", self.test_basic_endpoints),
             ("API v1 Endpoints", self.test_api_v1_endpoints),
             ("ML Recommendations", self.test_ml_recommendations),
+            ("Point Queries", self.test_point_queries),
+            ("Deferred Enrichment", self.test_deferred_enrichment),
             ("Model Management", self.test_model_management),
             ("Performance Metrics", self.test_performance_metrics),
         ]
@@ -13,6 +13,9 @@ from sklearn.metrics import mean_squared_error, r2_score
 from xgboost import XGBRegressor
 import os
 
+from backend.booster import booster_path, export_booster
+from backend.columnar import columnar_path, convert_dataset
+
 def generate_synthetic_dataset(num_sites=1000, seed=42):
     """Generate synthetic hydrogen site data"""
     print(f"Generating synthetic dataset with {num_sites} sites...")
@@ -115,11 +118,21 @@ def train_model(df, model_name="hydrogen_site_model.pkl"):
     joblib.dump(pipeline, model_path)
     print(f"\n✅ Model saved to: {model_path}")
     
+    # Keep an existing native booster export in step with the new model
+    if os.path.exists(booster_path(model_path)):
+        export_booster(model_path)
+        print(f"✅ Native booster refreshed: {booster_path(model_path)}")
+    
     # Save dataset
     dataset_path = os.path.join(os.path.dirname(__file__), "hydrogen_sites_generated.csv")
     df.to_csv(dataset_path, index=False)
     print(f"✅ Dataset saved to: {dataset_path}")
     
+    # Keep an existing columnar copy in step with the new CSV
+    if os.path.isdir(columnar_path(dataset_path)):
+        convert_dataset(dataset_path)
+        print(f"✅ Columnar copy refreshed: {columnar_path(dataset_path)}")
+    
     return pipeline, df
 
 def validate_model(pipeline, df):